@@ -17,17 +17,38 @@ Used to run the bot on it's own
 '''
 
 import argparse
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 
 import yaml
 
 from . import client
+from .profiling import StartupProfiler
 
 LOG_FILE = 'mawabot.log'
 LOG_FILE_MODE = 'w'
 LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 LOG_DATE_FORMAT = "[%d/%m/%Y %H:%M]"
+LOG_BACKUPS = 5
+PROFILE_FILE = 'mawabot-startup.txt'
+
+class JsonFormatter(logging.Formatter):
+    ''' Formats each record as one line of JSON '''
+
+    def format(self, record):
+        data = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
 
 if __name__ == '__main__':
     # Parse arguments
@@ -41,43 +62,76 @@ if __name__ == '__main__':
     argparser.add_argument('-D', '--discord',
             dest='dis_log', action='store_true',
             help="Adds the Discord logger to the log file.")
+    argparser.add_argument('-Q', '--log-queue',
+            dest='log_queue', action='store_true',
+            help="Write logs from a background thread instead of the event loop.")
+    argparser.add_argument('--log-json',
+            dest='log_json', action='store_true',
+            help="Write the log file as JSON lines.")
+    argparser.add_argument('--log-max-size',
+            dest='log_max_size', type=float, default=0,
+            help=f"Rotate the log file once it reaches this many MiB, keeping {LOG_BACKUPS} old files.")
+    argparser.add_argument('--profile-startup',
+            dest='profile', action='store_true',
+            help=f"Record startup and import times, and write them to {PROFILE_FILE}.")
     argparser.add_argument('config_file',
             help="Specify a configuration file to use. Keep it secret!")
     args = argparser.parse_args()
 
+    profiler = StartupProfiler(PROFILE_FILE, enabled=args.profile)
+    profiler.install()
+
     # Set up logging
     log_fmtr = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
-    log_hndl = logging.FileHandler(filename=LOG_FILE,
-                                   encoding='utf-8', mode=LOG_FILE_MODE)
-    log_hndl.setFormatter(log_fmtr)
+    if args.log_max_size > 0:
+        log_hndl = logging.handlers.RotatingFileHandler(filename=LOG_FILE,
+                                                        encoding='utf-8', mode=LOG_FILE_MODE,
+                                                        maxBytes=int(args.log_max_size * 1024 * 1024),
+                                                        backupCount=LOG_BACKUPS)
+    else:
+        log_hndl = logging.FileHandler(filename=LOG_FILE,
+                                       encoding='utf-8', mode=LOG_FILE_MODE)
+    log_hndl.setFormatter(JsonFormatter() if args.log_json else log_fmtr)
+    log_hndls = [log_hndl]
+
+    if args.stdout:
+        log_hndl = logging.StreamHandler(sys.stdout)
+        log_hndl.setFormatter(log_fmtr)
+        log_hndls.append(log_hndl)
+
+    if args.log_queue:
+        # The loggers only put records on the queue,
+        # the listener thread does the actual I/O
+        log_queue = queue.Queue(-1)
+        log_listener = logging.handlers.QueueListener(log_queue, *log_hndls)
+        log_listener.start()
+        atexit.register(log_listener.stop)
+        log_hndls = [logging.handlers.QueueHandler(log_queue)]
 
     log_level = logging.DEBUG if args.debug else logging.INFO
 
     logger = logging.getLogger(__package__)
     logger.setLevel(level=log_level)
-    logger.addHandler(log_hndl)
+    for log_hndl in log_hndls:
+        logger.addHandler(log_hndl)
 
     if args.dis_log:
         dis_logger = logging.getLogger('discord')
         dis_logger.setLevel(level=logging.INFO)
-        dis_logger.addHandler(log_hndl)
-
-    if args.stdout:
-        log_hndl = logging.StreamHandler(sys.stdout)
-        log_hndl.setFormatter(log_fmtr)
-        logger.addHandler(log_hndl)
-        if args.dis_log:
+        for log_hndl in log_hndls:
             dis_logger.addHandler(log_hndl)
 
     try:
         # Load config
-        with open(args.config_file, 'r') as fh:
-            config = yaml.safe_load(fh)
+        with profiler.phase('config load'):
+            with open(args.config_file, 'r') as fh:
+                config = yaml.safe_load(fh)
     except (yaml.YAMLError, IOError) as err:
         logger.error("Configuration file was invalid.")
         exit(1)
 
     # Open and run client
     logger.info("Starting bot...")
-    bot = client.Bot(config)
+    with profiler.phase('client construction'):
+        bot = client.Bot(config, profiler)
     bot.run_with_token()
@@ -0,0 +1,262 @@
+#
+# archive.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+archive.py
+Stores the messages the bot sees in SQLite, so they can be looked up by ID later
+'''
+
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'ArchivedMessage',
+    'MessageArchive',
+]
+
+# Write pending messages after this many seconds, or once there are this many
+FLUSH_INTERVAL = 2.0
+BATCH_SIZE = 200
+
+# How many IDs to look up per query
+READ_CHUNK = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    guild_id INTEGER,
+    author_id INTEGER NOT NULL,
+    author_name TEXT NOT NULL,
+    author_avatar TEXT,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    edited_at REAL,
+    attachments TEXT NOT NULL,
+    embeds TEXT NOT NULL
+)
+'''
+
+COLUMNS = (
+    'id',
+    'channel_id',
+    'guild_id',
+    'author_id',
+    'author_name',
+    'author_avatar',
+    'content',
+    'created_at',
+    'edited_at',
+    'attachments',
+    'embeds',
+)
+
+def _to_timestamp(when):
+    if when is None:
+        return None
+    return when.replace(tzinfo=timezone.utc).timestamp()
+
+def _from_timestamp(when):
+    if when is None:
+        return None
+    return datetime.utcfromtimestamp(when)
+
+class ArchivedMessage:
+    ''' What's kept of a message. Live messages are converted to this too,
+    so commands can treat both the same.
+    '''
+
+    __slots__ = COLUMNS
+
+    def __init__(self, **fields):
+        self.id = fields['id']
+        self.channel_id = fields['channel_id']
+        self.guild_id = fields['guild_id']
+        self.author_id = fields['author_id']
+        self.author_name = fields['author_name']
+        self.author_avatar = fields['author_avatar']
+        self.content = fields['content']
+        self.created_at = fields['created_at']
+        self.edited_at = fields['edited_at']
+        self.attachments = fields['attachments']
+        self.embeds = fields['embeds']
+
+    @classmethod
+    def from_message(cls, message):
+        guild = getattr(message.channel, 'guild', None)
+        return cls(
+            id=message.id,
+            channel_id=message.channel.id,
+            guild_id=guild.id if guild else None,
+            author_id=message.author.id,
+            author_name=message.author.display_name,
+            author_avatar=str(message.author.avatar_url),
+            content=message.content,
+            created_at=message.created_at,
+            edited_at=message.edited_at,
+            attachments=[attach.url for attach in message.attachments],
+            embeds=[embed.to_dict() for embed in message.embeds],
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        fields = dict(zip(COLUMNS, row))
+        fields['created_at'] = _from_timestamp(fields['created_at'])
+        fields['edited_at'] = _from_timestamp(fields['edited_at'])
+        fields['attachments'] = json.loads(fields['attachments'])
+        fields['embeds'] = json.loads(fields['embeds'])
+        return cls(**fields)
+
+    def to_row(self):
+        return (
+            self.id,
+            self.channel_id,
+            self.guild_id,
+            self.author_id,
+            self.author_name,
+            self.author_avatar,
+            self.content,
+            _to_timestamp(self.created_at),
+            _to_timestamp(self.edited_at),
+            json.dumps(self.attachments),
+            json.dumps(self.embeds),
+        )
+
+    def get_embeds(self):
+        return [discord.Embed.from_data(data) for data in self.embeds]
+
+class MessageArchive:
+    ''' SQLite message store, in WAL mode.
+    Messages are queued and written in batches from a single worker thread,
+    so the event loop never waits on the disk.
+    '''
+
+    __slots__ = (
+        'loop',
+        'path',
+        'conn',
+        'executor',
+        'pending',
+        'ready',
+        'task',
+        'written',
+    )
+
+    def __init__(self, loop, path):
+        self.loop = loop
+        self.path = path
+        self.conn = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.task = None
+        self.written = 0
+
+    # Worker thread side
+    def _open(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def _write(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO messages VALUES ({", ".join("?" * len(COLUMNS))})',
+                rows,
+            )
+
+    def _read(self, ids):
+        # Older SQLite builds allow at most 999 parameters per query
+        rows = []
+        for i in range(0, len(ids), READ_CHUNK):
+            chunk = ids[i:i + READ_CHUNK]
+            query = f'SELECT * FROM messages WHERE id IN ({", ".join("?" * len(chunk))})'
+            rows.extend(self.conn.execute(query, chunk).fetchall())
+        return rows
+
+    def _count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+    # Event loop side
+    async def start(self):
+        await self.loop.run_in_executor(self.executor, self._open)
+        self.task = self.loop.create_task(self._run())
+        logger.info(f'Archiving messages to {self.path}')
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        await self.flush()
+        if self.conn is not None:
+            await self.loop.run_in_executor(self.executor, self.conn.close)
+            self.conn = None
+        self.executor.shutdown(wait=False)
+
+    def add(self, message):
+        ''' Queues a message to be stored, replacing any earlier version of it '''
+
+        self.pending[message.id] = ArchivedMessage.from_message(message)
+        if len(self.pending) >= BATCH_SIZE:
+            self.ready.set()
+
+    async def flush(self):
+        if not self.pending or self.conn is None:
+            return
+
+        pending, self.pending = self.pending, {}
+        rows = [record.to_row() for record in pending.values()]
+        try:
+            await self.loop.run_in_executor(self.executor, self._write, rows)
+        except sqlite3.Error as error:
+            logger.error(f'Failed to archive {len(rows)} message(s)', exc_info=error)
+        else:
+            self.written += len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.ready.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            self.ready.clear()
+            await self.flush()
+
+    async def get_many(self, ids):
+        ''' Looks up the given message IDs, returning a dict of the ones stored '''
+
+        found = {id: self.pending[id] for id in ids if id in self.pending}
+        missing = [id for id in ids if id not in found]
+        if missing and self.conn is not None:
+            rows = await self.loop.run_in_executor(self.executor, self._read, missing)
+            for row in rows:
+                record = ArchivedMessage.from_row(row)
+                found[record.id] = record
+        return found
+
+    async def get(self, id):
+        return (await self.get_many((id,))).get(id)
+
+    async def count(self):
+        return await self.loop.run_in_executor(self.executor, self._count) + len(self.pending)
@@ -18,10 +18,24 @@ Holds the custom discord client
 import datetime
 import logging
 import os
+import sqlite3
+import time
 
 import discord
 from discord.ext import commands
 
+from .archive import MessageArchive
+from .exporter import MetricsServer
+from .hotreload import ModuleTracker
+from .manifest import scan_cog
+from .metrics import REST_TIME, Counters, LatencyTracker, LoopLag, PingTracker, instrument_http
+from .names import NameIndex
+from .outbound import OutputQueue
+from .profiling import StartupProfiler
+from .ratelimit import RouteScheduler
+from .recent import RecentMessages
+from .router import MessageRouter
+from .watchdog import Watchdog
 from .utils import Reloader
 
 logger = logging.getLogger(__name__)
@@ -32,18 +46,49 @@ class Bot(commands.Bot):
     __slots__ = (
         'config',
         'logger',
+        'names',
+        'lazy_commands',
+        'modules',
+        'profiler',
+        'rest',
+        'outbound',
+        'recent',
+        'router',
+        'archive',
+        'latencies',
+        'counters',
+        'loop_lag',
+        'pings',
+        'metrics_server',
+        'watchdog',
         'start_time',
         'output_chan',
     )
 
-    def __init__(self, config):
+    def __init__(self, config, profiler=None):
         self.config = config
+        self.profiler = profiler or StartupProfiler(enabled=False)
         self.start_time = datetime.datetime.utcnow()
         self.output_chan = None
+        self.names = NameIndex(self)
+        self.lazy_commands = {}
+        self.modules = ModuleTracker()
+        self.rest = RouteScheduler(self)
+        self.outbound = OutputQueue(self)
+        self.recent = RecentMessages(self)
+        self.router = MessageRouter()
+        self.archive = None
+        self.latencies = LatencyTracker()
+        self.counters = Counters()
+        self.loop_lag = LoopLag()
+        self.pings = PingTracker()
+        self.metrics_server = None
+        self.watchdog = None
         super().__init__(command_prefix=config['prefix'],
                          description='maware\'s self-bot',
                          pm_help=False,
                          self_bot=True)
+        instrument_http(self.http, self.counters, self.pings)
 
     @property
     def uptime(self):
@@ -60,21 +105,64 @@ class Bot(commands.Bot):
             logger.critical(err_msg)
             raise ValueError("Token is empty")
         else:
+            self.profiler.mark('run')
             return self.run(self.config['token'], bot=False)
 
+    def dispatch(self, event, *args, **kwargs):
+        self.counters.events[event] += 1
+        if event == 'message':
+            self.pings.record_event(args[0].id)
+        elif event == 'socket_raw_receive':
+            # The first one is the gateway's HELLO
+            self.profiler.mark('gateway connected')
+        super().dispatch(event, *args, **kwargs)
+
+    async def login(self, *args, **kwargs):
+        await super().login(*args, **kwargs)
+        self.profiler.mark('logged in')
+
     async def on_ready(self):
         ''' When bot has fully logged on
         Log bots username and ID
         Then load cogs
         '''
 
+        self.profiler.mark('READY')
+
         if self.config['output-channel'] is None:
             logger.warning('No output channel set in config.')
         else:
             self.output_chan = self.get_channel(int(self.config['output-channel']))
 
-        self.add_cog(Reloader(self))
-        logger.info('Loaded cog: Reloader')
+        self.loop_lag.start(self.loop)
+        self.pings.start(self)
+
+        threshold = self.config.get('watchdog')
+        if threshold and self.watchdog is None:
+            self.watchdog = Watchdog(self, threshold)
+            self.watchdog.start()
+
+        metrics = self.config.get('metrics')
+        if metrics and self.metrics_server is None:
+            self.metrics_server = MetricsServer(self, metrics.get('host'), metrics.get('port'))
+            try:
+                await self.metrics_server.start()
+            except OSError as error:
+                logger.error('Could not start metrics server', exc_info=error)
+
+        path = self.config.get('archive')
+        if path and self.archive is None:
+            archive = MessageArchive(self.loop, path)
+            try:
+                await archive.start()
+            except sqlite3.Error as error:
+                logger.error(f'Could not open message archive {path}', exc_info=error)
+            else:
+                self.archive = archive
+
+        if self.get_cog('Reloader') is None:
+            self.add_cog(Reloader(self))
+            logger.info('Loaded cog: Reloader')
 
         def _cog_ok(cog):
             return cog[0] != '_' and os.path.isdir(f'mawabot/cogs/{cog}')
@@ -82,9 +170,22 @@ class Bot(commands.Bot):
         files = [cog for cog in os.listdir('mawabot/cogs') if _cog_ok(cog)]
         logger.debug(f'Cogs found: {files}')
 
+        lazy = self.config.get('lazy-cogs', False)
         for file in files:
+            name = f'mawabot.cogs.{file}'
+            if name in self.extensions or name in self.lazy_commands.values():
+                # Already set up by an earlier READY
+                continue
+
             try:
-                self.load_extension(f'mawabot.cogs.{file}')
+                if lazy:
+                    manifest = scan_cog(f'mawabot/cogs/{file}')
+                    if not manifest.eager:
+                        self.lazy_commands.update(dict.fromkeys(manifest.commands, name))
+                        logger.info(f'Deferred cog: {file}')
+                        continue
+
+                self.load_extension(name)
             except Exception as error:
                 # Something made the loading fail
                 # So log it with reason and tell user to check it
@@ -93,6 +194,9 @@ class Bot(commands.Bot):
             else:
                 logger.info(f'Loaded cog: {file}')
 
+        with self.profiler.phase('name index'):
+            self.names.fill()
+
         channels = sum(1 for _ in self.get_all_channels())
         logger.info(f'Logged in as {self.user.name} ({self.user.id})')
         logger.info('Connected to:')
@@ -102,20 +206,162 @@ class Bot(commands.Bot):
         logger.info('------')
         logger.info('Ready!')
 
+        self.profiler.finish(deferred=bool(self.lazy_commands))
+
         logger.info('Setting status to invisible')
         await self.change_presence(status=discord.Status.invisible)
 
+    def load_extension(self, name):
+        deferred = name in self.lazy_commands.values()
+        with self.profiler.phase(f'load_extension {name}', cog=name):
+            super().load_extension(name)
+        self.modules.snapshot(name)
+
+        # Drop any lazy entries for it, however it ended up loaded
+        for command, extension in list(self.lazy_commands.items()):
+            if extension == name:
+                del self.lazy_commands[command]
+
+        if deferred:
+            self.profiler.deferred_loaded(name, remaining=bool(self.lazy_commands))
+
+    def remove_cog(self, name):
+        cog = self.get_cog(name)
+        super().remove_cog(name)
+        if cog is not None:
+            self.router.remove_owner(cog)
+
+    async def invoke(self, ctx):
+        ''' Imports deferred cogs the first time one of their commands is used '''
+
+        if ctx.command is None and ctx.invoked_with in self.lazy_commands:
+            name = self.lazy_commands[ctx.invoked_with]
+            logger.info(f'Loading deferred cog for "{ctx.invoked_with}": {name}')
+            try:
+                self.load_extension(name)
+            except Exception as error:
+                logger.error(f'Deferred cog load failed: {name}', exc_info=error)
+                embed = discord.Embed(color=discord.Color.red(), description=f'```{error}```')
+                embed.set_author(name=f'Could not load {name} for "{ctx.invoked_with}"')
+                await self.output_send(embed=embed)
+                return
+
+            ctx.command = self.all_commands.get(ctx.invoked_with)
+
+        if ctx.command is None:
+            await super().invoke(ctx)
+            return
+
+        # Time the command, see LatencyTracker
+        delay = datetime.datetime.utcnow() - discord.utils.snowflake_time(ctx.message.id)
+        rest = [0.0]
+        token = REST_TIME.set(rest)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            handler = time.perf_counter() - start
+            REST_TIME.reset(token)
+            self.latencies.record(ctx.command.qualified_name, delay.total_seconds(), handler, rest[0])
+
+    async def close(self):
+        path = self.config.get('latency-file')
+        if path:
+            try:
+                self.latencies.dump(path)
+            except IOError as error:
+                logger.error(f'Could not write latencies to {path}', exc_info=error)
+
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
+        if self.archive is not None:
+            await self.archive.close()
+
+        await super().close()
+
     async def on_resumed(self):
         ''' Used when the bot reconnects '''
 
         logger.info('Reconnected - setting status to invisible')
         await self.change_presence(status=discord.Status.invisible)
 
-    async def output_send(self, *args, **kwargs):
+    async def on_message(self, message):
+        ''' The only message handler, cogs register triggers with the router instead '''
+
+        if self.archive is not None:
+            self.archive.add(message)
+
+        # Everything else is only for my own messages,
+        # so the rest of the world costs one comparison
+        if message.author.id != self.user.id:
+            return
+
+        if not self.router.first_seen(message.id):
+            return
+
+        self.recent.add(message)
+        await self.router.dispatch(message)
+        await self.process_commands(message)
+
+    async def on_message_edit(self, before, after):
+        if self.archive is not None:
+            self.archive.add(after)
+
+    # The raw events fire even for messages discord.py doesn't have cached
+    async def on_raw_message_delete(self, payload):
+        self.recent.remove(payload.channel_id, payload.message_id)
+
+    async def on_raw_bulk_message_delete(self, payload):
+        self.recent.remove(payload.channel_id, *payload.message_ids)
+
+    # Keep the name index up to date
+    async def on_member_join(self, member):
+        self.names.add('users', member)
+
+    async def on_member_update(self, before, after):
+        self.names.add('users', after)
+
+    async def on_user_update(self, before, after):
+        self.names.add('users', after)
+
+    async def on_guild_join(self, guild):
+        self.names.add_guild(guild)
+
+    async def on_guild_remove(self, guild):
+        self.names.remove_guild(guild)
+
+    async def on_guild_update(self, before, after):
+        self.names.add('guilds', after)
+
+    async def on_guild_channel_create(self, channel):
+        self.names.add('channels', channel)
+
+    async def on_guild_channel_delete(self, channel):
+        self.names.remove('channels', channel)
+
+    async def on_guild_channel_update(self, before, after):
+        self.names.add('channels', after)
+
+    async def on_guild_role_create(self, role):
+        self.names.add_role(role)
+
+    async def on_guild_role_delete(self, role):
+        self.names.remove_role(role)
+
+    async def on_guild_role_update(self, before, after):
+        self.names.add_role(after)
+
+    async def output_send(self, content=None, **kwargs):
+        ''' Queues a message for the output channel, see OutputQueue '''
+
         if self.output_chan is None:
             logger.warning('No output channel set!')
         else:
-            await self.output_chan.send(*args, **kwargs)
+            self.outbound.put(content, **kwargs)
 
     @commands.command()
     async def panic(self, arg: str = ''):
@@ -12,12 +12,17 @@
 
 ''' Holds commands related to mathematics '''
 import asyncio
-import math
+import re
 
 import discord
 from discord.ext import commands
 
-MATH_LOCALS = {name: getattr(math, name) for name in dir(math) if not name.startswith('_')}
+from .sandbox import CalcError, CalcPool
+
+# "<expr> x=<start>..<stop> [n=<points>]"
+RANGE_REGEX = re.compile(
+    r'(.+?)\s+([A-Za-z_]\w*)\s*=\s*(\S+?)\s*\.\.\s*(\S+?)(?:\s+n\s*=\s*([0-9]+))?\s*$',
+)
 
 __all__ = [
     'Calc',
@@ -26,17 +31,20 @@ __all__ = [
 class Calc:
     __slots__ = (
         'bot',
+        'pool',
     )
 
     def __init__(self, bot):
         self.bot = bot
+        self.pool = CalcPool(bot.loop)
+        self.pool.start()
 
-    @commands.command()
-    async def calc(self, ctx, *, expr: str = '(nothing)'):
-        ''' Evaluates a mathematical expression and prints the result '''
+    def __unload(self):
+        self.pool.close()
 
+    async def _show(self, ctx, title, expr, result):
         embed = discord.Embed(type='rich')
-        embed.set_author(name='Calculator:')
+        embed.set_author(name=title)
         lines = [
             '**Input:**',
             expr.replace('*', r'\*'),
@@ -48,15 +56,10 @@ class Calc:
         # pylint: disable=assigning-non-slot
 
         try:
-            # pylint: disable=eval-used
-            result = eval(expr, MATH_LOCALS)
-            if isinstance(result, float):
-                lines.append(f'{result:.4f}')
-            else:
-                lines.append(str(result))
+            lines.append(await result)
             embed.color = discord.Color.teal()
         except Exception as ex:
-            lines.append(f'Error: {ex}')
+            lines.append(f'Error: {str(ex) or type(ex).__name__}')
             embed.color = discord.Color.red()
 
         embed.description = '\n'.join(lines)
@@ -64,3 +67,34 @@ class Calc:
             ctx.send(embed=embed),
             ctx.message.delete(),
         )
+
+    async def _show_range(self, ctx, mode, spec):
+        async def run():
+            match = RANGE_REGEX.match(spec)
+            if match is None:
+                raise CalcError(f'Usage: calc {mode} <expression> x=<start>..<stop> [n=<points>]')
+
+            expr, name, start, stop, points = match.groups()
+            points = int(points) if points else None
+            result = await self.pool.evaluate_range(expr, name, start, stop, points=points, mode=mode)
+            return f'```\n{result}\n```'
+
+        await self._show(ctx, f'Calculator ({mode}):', spec, run())
+
+    @commands.group(invoke_without_command=True)
+    async def calc(self, ctx, *, expr: str = '(nothing)'):
+        ''' Evaluates a mathematical expression and prints the result '''
+
+        await self._show(ctx, 'Calculator:', expr, self.pool.evaluate(expr))
+
+    @calc.command(name='table')
+    async def calc_table(self, ctx, *, spec: str = ''):
+        ''' Evaluates an expression over a range: "calc table <expr> x=0..100 [n=1000]" '''
+
+        await self._show_range(ctx, 'table', spec)
+
+    @calc.command(name='sum')
+    async def calc_sum(self, ctx, *, spec: str = ''):
+        ''' Sums an expression over a range: "calc sum <expr> x=1..10**6 [n=1000]" '''
+
+        await self._show_range(ctx, 'sum', spec)
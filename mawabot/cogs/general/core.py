@@ -12,7 +12,7 @@
 
 ''' Has general or miscellaneous commands '''
 import asyncio
-from datetime import datetime
+import time
 
 import discord
 from discord.ext import commands
@@ -33,11 +33,31 @@ class General:
 
     @commands.command()
     async def ping(self, ctx):
-        ''' Pong '''
-
-        delta = datetime.utcnow() - discord.utils.snowflake_time(ctx.message.id)
-        delay = delta.seconds * 1000 + delta.microseconds / 1000
-        await ctx.message.edit(content=f'**Pong!** ({delay} ms)')
+        ''' Pong, with the gateway, REST and event delivery latencies '''
+
+        pings = self.bot.pings
+        event = pings.arrival_delay(ctx.message.id)
+        if event is None:
+            event = pings.event_delay(ctx.message.id)
+
+        start = time.perf_counter()
+        await ctx.message.edit(content='**Pong!**')
+        rest = (time.perf_counter() - start) * 1000
+
+        def line(name, now, window):
+            if not window:
+                return f'{name}: `{now:.0f} ms`'
+            p50, p95 = window.percentile(50), window.percentile(95)
+            return f'{name}: `{now:.0f} ms` (p50 `{p50:.0f}`, p95 `{p95:.0f}`, {len(window)} samples)'
+
+        lines = [
+            '**Pong!**',
+            line('Gateway', self.bot.latency * 1000, pings.gateway),
+            line('REST edit', rest, pings.rest),
+            line('Event delay', event, pings.event),
+            f'Clock offset: `{pings.offset * 1000:+.0f} ms`',
+        ]
+        await ctx.message.edit(content='\n'.join(lines))
 
     @commands.command()
     @commands.guild_only()
@@ -70,13 +90,20 @@ class General:
             ctx.message.edit(content=content),
         )
 
+    @staticmethod
+    def _not_found(kind, suggestions):
+        if suggestions:
+            return f'(No such {kind}) {utils.did_you_mean(suggestions)}'
+        return f'(No such {kind})'
+
     def _get_user_mention(self, name):
         if name.isdigit():
             id = int(name)
             user = self.bot.get_user(id)
         else:
-            name = utils.normalize_caseless(name)
-            user = discord.utils.find(lambda u: utils.normalize_caseless(u.name) == name, self.bot.users)
+            user = self.bot.names.find_user(name)
+            if user is None:
+                return self._not_found('user', self.bot.names.search_users(name))
         return getattr(user, 'mention', '(No such user)')
 
     @commands.command()
@@ -98,9 +125,9 @@ class General:
             id = int(name)
             chan = self.bot.get_channel(id)
         else:
-            name = utils.normalize_caseless(name)
-            channels = guild.channels if guild else self.bot.get_all_channels()
-            chan = discord.utils.find(lambda c: utils.normalize_caseless(c.name) == name, channels)
+            chan = self.bot.names.find_channel(name, guild)
+            if chan is None:
+                return self._not_found('channel', self.bot.names.search_channels(name, guild))
         return getattr(chan, 'mention', '(No such channel)')
 
     @commands.command()
@@ -119,11 +146,11 @@ class General:
 
     def _get_role_mention(self, guild, name):
         if name.isdigit():
-            id = int(name)
-            role = discord.utils.find(lambda r: r.id == id, guild.roles)
+            role = self.bot.names.get_role(int(name), guild)
         else:
-            name = name.lower()
-            role = discord.utils.find(lambda r: r.name.lower() == name, guild.roles)
+            role = self.bot.names.find_role(name, guild)
+            if role is None:
+                return self._not_found('role', self.bot.names.search_roles(name, guild))
         return getattr(role, 'mention', '(No such role)')
 
     @commands.command()
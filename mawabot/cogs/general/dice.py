@@ -14,15 +14,477 @@
 
 import random
 import re
+from functools import lru_cache
 
+import numpy as np
 from discord.ext import commands
 
-DICE_REGEX = re.compile(r'(?:([0-9]+)?\s*d)?\s*([0-9]+)', re.IGNORECASE)
+# One term of a dice expression, like "+ 4d6kh3", "- 2d10!" or "+ 5"
+TERM_REGEX = re.compile(r'''
+    \s*(?P<sign>[+-])?\s*
+    (?:
+        (?P<count>[0-9]*)\s*d\s*(?P<sides>[0-9]+|%)
+        (?:\s*(?P<explode>!))?
+        (?:\s*(?P<keep>kh|kl|dh|dl|k|d)\s*(?P<keep_count>[0-9]+))?
+        |
+        (?P<constant>[0-9]+)
+    )\s*
+''', re.IGNORECASE | re.VERBOSE)
+
+MAX_TERMS = 20
+MAX_DICE = 10 ** 12
+MAX_SIDES = 10 ** 6
+MAX_EXPLOSIONS = 1000
+
+# Pools up to this size are rolled one die at a time and listed,
+# bigger ones are rolled by sampling how many dice landed on each face.
+# Dice with more sides than POOL_BANDS are sampled in that many bands of faces
+# instead, so the cost doesn't grow with the number of sides.
+SMALL_POOL = 100
+POOL_BANDS = 1000
+BAND_ARRAY = 1000
+MAX_DETAIL = 1500
+
+# Limits for exact distributions
+MAX_STATS_RANGE = 5 * 10 ** 5
+MAX_STATS_KEEP_DICE = 50
+MAX_STATS_KEEP_WORK = 2 * 10 ** 8
+EXPLODE_EPSILON = 1e-12
+FFT_THRESHOLD = 64
+PERCENTILES = (5, 25, 50, 75, 95)
 
 __all__ = [
     'Dice',
+    'DiceError',
+    'DiceTerm',
+    'dice_distribution',
+    'format_dice',
+    'parse_dice',
+    'roll_dice',
 ]
 
+class DiceError(ValueError):
+    pass
+
+class DiceTerm:
+    ''' "XdY", optionally exploding, keeping the highest or lowest N.
+    A constant is a term with no sides.
+    '''
+
+    __slots__ = (
+        'sign',
+        'count',
+        'sides',
+        'explode',
+        'keep',
+    )
+
+    def __init__(self, sign, count, sides=None, explode=False, keep=None):
+        self.sign = sign
+        self.count = count
+        self.sides = sides
+        self.explode = explode
+
+        # ('h', N) keeps the highest N dice, ('l', N) the lowest N
+        self.keep = keep
+
+    def __str__(self):
+        if self.sides is None:
+            return str(self.count)
+
+        explode = '!' if self.explode else ''
+        keep = f'k{self.keep[0]}{self.keep[1]}' if self.keep else ''
+        return f'{self.count}d{self.sides}{explode}{keep}'
+
+    def roll(self):
+        ''' Rolls the term, returning (total, detail) '''
+
+        if self.sides is None:
+            return self.count, str(self.count)
+        if self.count <= SMALL_POOL:
+            return self._roll_small()
+        return self._roll_pool()
+
+    def _roll_small(self):
+        rolls = [random.randint(1, self.sides) for _ in range(self.count)]
+
+        if self.explode:
+            i = 0
+            while i < len(rolls) and len(rolls) - self.count < MAX_EXPLOSIONS:
+                if rolls[i] == self.sides:
+                    rolls.append(random.randint(1, self.sides))
+                i += 1
+
+        kept = set(range(len(rolls)))
+        if self.keep:
+            mode, count = self.keep
+            order = sorted(range(len(rolls)), key=rolls.__getitem__, reverse=mode == 'h')
+            kept = set(order[:count])
+
+        total = sum(rolls[i] for i in kept)
+        detail = ', '.join(str(roll) if i in kept else f'~~{roll}~~' for i, roll in enumerate(rolls))
+        return total, f'[{detail}]'
+
+    def _roll_pool(self):
+        # Rolling n dice is the same as sampling how many land on each face.
+        # Big dice are split into bands of faces, with the top face on its own
+        # so explosions are exact. Sampling only depends on the number of bands.
+        segments = _segments(self.sides)
+        sizes = np.array([hi - lo + 1 for lo, hi in segments], dtype=np.float64)
+        chances = sizes / self.sides
+        counts = np.random.multinomial(self.count, chances)
+
+        explosions = 0
+        if self.explode:
+            extra = counts[-1]
+            while extra and explosions < MAX_EXPLOSIONS * SMALL_POOL:
+                explosions += extra
+                new = np.random.multinomial(extra, chances)
+                counts += new
+                extra = new[-1]
+
+        dice = self.count + explosions
+        taken = counts
+        if self.keep:
+            mode, count = self.keep
+            if mode == 'h':
+                counts, taken = counts[::-1], taken[::-1]
+
+            # Take whole segments until there are enough dice
+            before = np.cumsum(counts) - counts
+            taken = np.clip(count - before, 0, counts)
+            if mode == 'h':
+                counts, taken = counts[::-1], taken[::-1]
+
+        top = not self.keep or self.keep[0] == 'h'
+        kept = int(taken.sum())
+        total = sum(
+            _segment_sum(lo, hi, int(number), int(use), top)
+            for (lo, hi), number, use in zip(segments, counts, taken) if use
+        )
+
+        notes = [f'avg {total / kept:.2f}' if kept else 'none kept']
+        if explosions:
+            notes.append(f'{explosions:,} exploded')
+        if kept != dice:
+            notes.append(f'kept {kept:,} of {dice:,}')
+        return total, f'{total:,} ({", ".join(notes)})'
+
+@lru_cache(maxsize=64)
+def _segments(sides):
+    ''' Splits a die's faces into up to POOL_BANDS ranges, with the top face alone '''
+
+    if sides <= POOL_BANDS:
+        return tuple((face, face) for face in range(1, sides + 1))
+
+    edges = np.linspace(1, sides, POOL_BANDS).round().astype(np.int64)
+    segments = [(int(lo), int(hi) - 1) for lo, hi in zip(edges, edges[1:])]
+    return tuple(segments) + ((sides, sides),)
+
+def _segment_sum(lo, hi, count, taken, top):
+    ''' Samples the sum of the highest (or lowest) "taken" of "count" dice
+    that landed between lo and hi. Exact for small counts, otherwise uses
+    the normal approximation, which is very close with that many dice.
+    '''
+
+    if lo == hi:
+        return taken * lo
+
+    if count <= BAND_ARRAY:
+        rolls = np.random.randint(lo, hi + 1, size=count)
+        if taken < count:
+            rolls = np.sort(rolls)
+            rolls = rolls[-taken:] if top else rolls[:taken]
+        return int(rolls.sum())
+
+    if taken < count:
+        # The kept dice are about the top (or bottom) taken/count of the range
+        span = max(1, round((hi - lo + 1) * taken / count))
+        lo, hi = (hi - span + 1, hi) if top else (lo, lo + span - 1)
+        if taken <= BAND_ARRAY:
+            return int(np.random.randint(lo, hi + 1, size=taken).sum())
+
+    width = hi - lo + 1
+    mean = taken * (lo + hi) / 2
+    deviation = (taken * (width * width - 1) / 12) ** 0.5
+    total = round(np.random.normal(mean, deviation))
+    return int(min(max(total, taken * lo), taken * hi))
+
+def parse_dice(expr):
+    ''' Parses a dice expression like "4d6kh3 + 2d8! - 1" into a list of terms '''
+
+    expr = expr.strip()
+    if expr.isdigit():
+        # "roll 20" means a d20
+        expr = f'd{expr}'
+
+    terms = []
+    pos = 0
+    while pos < len(expr):
+        match = TERM_REGEX.match(expr, pos)
+        if match is None or match.end() == pos:
+            raise DiceError(f'Invalid dice expression at "{expr[pos:]}"')
+        if terms and match['sign'] is None:
+            raise DiceError(f'Expected + or - before "{match[0].strip()}"')
+
+        terms.append(_make_term(match))
+        if len(terms) > MAX_TERMS:
+            raise DiceError(f'Too many terms, at most {MAX_TERMS} are allowed')
+        pos = match.end()
+
+    if not terms:
+        raise DiceError('No dice to roll')
+    return terms
+
+def _make_term(match):
+    sign = -1 if match['sign'] == '-' else 1
+
+    if match['constant'] is not None:
+        return DiceTerm(sign, int(match['constant']))
+
+    count = int(match['count']) if match['count'] else 1
+    sides = 100 if match['sides'] == '%' else int(match['sides'])
+    explode = match['explode'] is not None
+
+    if not 1 <= count <= MAX_DICE:
+        raise DiceError(f'Number of dice must be between 1 and {MAX_DICE:,}')
+    if not 1 <= sides <= MAX_SIDES:
+        raise DiceError(f'Number of sides must be between 1 and {MAX_SIDES:,}')
+    if explode and sides == 1:
+        raise DiceError("One-sided dice can't explode")
+
+    keep = None
+    if match['keep']:
+        mode = match['keep'].lower()
+        keep_count = int(match['keep_count'])
+        if keep_count > count:
+            raise DiceError(f"Can't keep or drop {keep_count} of {count} dice")
+
+        if mode in ('kh', 'k'):
+            keep = ('h', keep_count)
+        elif mode == 'kl':
+            keep = ('l', keep_count)
+        elif mode in ('dl', 'd'):
+            keep = ('h', count - keep_count)
+        else:
+            keep = ('l', count - keep_count)
+
+    return DiceTerm(sign, count, sides, explode, keep)
+
+def format_dice(terms):
+    ''' Writes the terms back out as a dice expression '''
+
+    parts = []
+    for term in terms:
+        if parts or term.sign < 0:
+            parts.append('-' if term.sign < 0 else '+')
+        parts.append(str(term))
+    return ' '.join(parts)
+
+def roll_dice(terms):
+    ''' Rolls every term, returning the total and a description of the rolls '''
+
+    total = 0
+    parts = []
+    for term in terms:
+        value, detail = term.roll()
+        total += term.sign * value
+        if parts or term.sign < 0:
+            parts.append('-' if term.sign < 0 else '+')
+        parts.append(detail)
+    return total, ' '.join(parts)
+
+def _convolve(a, b):
+    ''' Multiplies two polynomials, through an FFT once they get long '''
+
+    if min(len(a), len(b)) < FFT_THRESHOLD:
+        return np.convolve(a, b)
+
+    # Padding to a power of two keeps the FFT fast
+    size = len(a) + len(b) - 1
+    padded = 1 << (size - 1).bit_length()
+    result = np.fft.irfft(np.fft.rfft(a, padded) * np.fft.rfft(b, padded), padded)[:size]
+
+    # Rounding in the FFT leaves tiny negative values where there should be zeros
+    return np.clip(result, 0, None)
+
+def _power(poly, exponent):
+    ''' Raises a polynomial to a power by repeated squaring '''
+
+    result = np.ones(1)
+    while exponent:
+        if exponent & 1:
+            result = _convolve(result, poly)
+        exponent >>= 1
+        if exponent:
+            poly = _convolve(poly, poly)
+    return result
+
+def _explode_depth(sides):
+    ''' How many explosions to follow before the chain is too unlikely to matter '''
+
+    depth = 1
+    while (1 / sides) ** depth > EXPLODE_EPSILON:
+        depth += 1
+    return depth
+
+def _single_die(sides, explode):
+    ''' Gets the probabilities of one die's values, starting from 1 '''
+
+    if not explode:
+        return np.full(sides, 1 / sides)
+
+    # Each explosion adds another die
+    depth = _explode_depth(sides)
+    probs = np.zeros(depth * sides)
+    for level in range(depth):
+        chance = (1 / sides) ** (level + 1)
+        start = level * sides
+        probs[start:start + sides - 1] = chance
+    probs[-1] = (1 / sides) ** depth
+    return probs
+
+def _keep_distribution(count, sides, mode, keep):
+    ''' Distribution of the sum of the highest (or lowest) "keep" of "count" dice.
+    Goes through the faces from the kept end, choosing how many dice show each one.
+    Only the number of dice placed so far needs tracking, since the first "keep"
+    dice placed are exactly the kept ones.
+    '''
+
+    faces = range(sides, 0, -1) if mode == 'h' else range(1, sides + 1)
+    length = keep * sides + 1
+
+    # states[placed][total]
+    states = np.zeros((count + 1, length))
+    states[0, 0] = 1.0
+
+    for face in faces:
+        new = np.zeros_like(states)
+        for placed in range(count + 1):
+            row = states[placed]
+            if not row.any():
+                continue
+
+            # Chance of a specific "number" of the remaining dice showing this face,
+            # and the others being placed later: C(left, number) / sides ** number
+            left = count - placed
+            chance = 1.0
+            for number in range(left + 1):
+                if number:
+                    chance *= (left - number + 1) / number / sides
+                if chance == 0:
+                    break
+                shift = face * (min(placed + number, keep) - min(placed, keep))
+                if shift:
+                    new[placed + number, shift:] += row[:length - shift] * chance
+                else:
+                    new[placed + number] += row * chance
+        states = new
+
+    return states[count]
+
+@lru_cache(maxsize=128)
+def _term_distribution(count, sides, explode, keep):
+    ''' Gets a term's distribution as (lowest value, probabilities) '''
+
+    if keep is not None:
+        if explode:
+            raise DiceError("Can't combine keep/drop with exploding dice for stats")
+        if count > MAX_STATS_KEEP_DICE:
+            raise DiceError(f'Stats with keep/drop are limited to {MAX_STATS_KEEP_DICE} dice')
+
+        mode, number = keep
+        return 0, _keep_distribution(count, sides, mode, number)
+
+    return count, _power(_single_die(sides, explode), count)
+
+@lru_cache(maxsize=64)
+def dice_distribution(expr):
+    ''' Gets the exact distribution of a dice expression's total, as (lowest value, probabilities).
+    Takes the canonical expression from format_dice(), so equivalent input shares a cache entry.
+    '''
+
+    terms = parse_dice(expr)
+
+    # Check the size before doing any work
+    span = 0
+    for term in terms:
+        if term.sides is not None:
+            rolls = term.keep[1] if term.keep else term.count
+            span += rolls * term.sides * (_explode_depth(term.sides) if term.explode else 1)
+    if span > MAX_STATS_RANGE:
+        raise DiceError('That expression has too many possible outcomes for stats')
+
+    # Keeping dice goes through every face, for every way to place the dice, over the whole range
+    work = sum(
+        term.sides * (term.count + 1) ** 2 // 2 * (term.keep[1] * term.sides + 1)
+        for term in terms if term.sides is not None and term.keep
+    )
+    if work > MAX_STATS_KEEP_WORK:
+        raise DiceError('That keep/drop is too expensive for stats, try fewer dice or sides')
+
+    offset = 0
+    probs = np.ones(1)
+    for term in terms:
+        if term.sides is None:
+            offset += term.sign * term.count
+            continue
+
+        low, term_probs = _term_distribution(term.count, term.sides, term.explode, term.keep)
+        if term.sign < 0:
+            # Subtracting flips the distribution around
+            low = -(low + len(term_probs) - 1)
+            term_probs = term_probs[::-1]
+
+        offset += low
+        probs = _convolve(probs, term_probs)
+
+    probs = probs / probs.sum()
+    return offset, probs
+
+def _bounds(terms):
+    ''' Gets the lowest and highest possible totals, with None for no limit '''
+
+    low = high = 0
+    for term in terms:
+        if term.sides is None:
+            smallest = largest = term.count
+        else:
+            rolls = term.keep[1] if term.keep else term.count
+            smallest, largest = rolls, None if term.explode else rolls * term.sides
+
+        if term.sign < 0:
+            smallest, largest = (None if largest is None else -largest), -smallest
+
+        low = None if low is None or smallest is None else low + smallest
+        high = None if high is None or largest is None else high + largest
+    return low, high
+
+def dice_stats(expr):
+    ''' Describes the distribution of a dice expression '''
+
+    offset, probs = dice_distribution(expr)
+    values = np.arange(offset, offset + len(probs))
+    low, high = _bounds(parse_dice(expr))
+    low = '-∞' if low is None else f'{low:,}'
+    high = '∞' if high is None else f'{high:,}'
+
+    mean = float(np.dot(values, probs))
+    variance = float(np.dot((values - mean) ** 2, probs))
+    mode = values[probs.argmax()]
+    cumulative = np.cumsum(probs)
+
+    lines = [
+        f'range     {low} to {high}',
+        f'mean      {mean:,.3f}',
+        f'variance  {variance:,.3f} (σ {variance ** 0.5:,.3f})',
+        f'mode      {mode:,} ({probs.max():.3%})',
+    ]
+    for pct in PERCENTILES:
+        index = min(np.searchsorted(cumulative, pct / 100), len(values) - 1)
+        lines.append(f'p{pct:<8} {values[index]:,}')
+    return '\n'.join(lines)
+
 class Dice:
     __slots__ = (
         'bot',
@@ -31,31 +493,33 @@ class Dice:
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.command()
-    async def roll(self, ctx, *, roll: str = ''):
-        ''' "XdY" rolls X dice with Y sides '''
+    @commands.group(invoke_without_command=True)
+    async def roll(self, ctx, *, roll: str = 'd6'):
+        ''' Rolls dice, e.g. "2d20kh1 + 5", "4d6dl1", "3d6!" or "1000000d6" '''
 
-        if roll:
-            match = DICE_REGEX.match(roll)
-            if match is None:
-                return
+        try:
+            terms = parse_dice(roll)
+        except DiceError as error:
+            await ctx.send(content=f'🎲 {error}')
+            return
 
-            dice = int(match[1]) if match[1] else 1
-            sides = int(match[2])
+        total, detail = roll_dice(terms)
+        if len(terms) == 1 and terms[0].count == 1 and not terms[0].explode:
+            await ctx.send(content=f'🎲 {total}')
+        elif len(detail) > MAX_DETAIL:
+            await ctx.send(content=f'🎲 {format_dice(terms)} = {total:,}')
         else:
-            dice = 1
-            sides = 6
+            await ctx.send(content=f'🎲 {detail} = {total:,}')
 
-        if dice == 1:
-            result = random.randint(1, sides)
-            await ctx.send(content=f'🎲 {result}')
-        else:
-            rolls = []
-            total = 0
-            for _ in range(dice):
-                result = random.randint(1, sides)
-                rolls.append(f'{result}')
-                total += result
-
-            rolls = ' + '.join(rolls)
-            await ctx.send(content=f'🎲 {rolls} = {total}')
+    @roll.command(name='stats')
+    async def roll_stats(self, ctx, *, roll: str = 'd6'):
+        ''' Shows the exact distribution of a dice expression, e.g. "12d20 + 3d6" '''
+
+        try:
+            expr = format_dice(parse_dice(roll))
+            stats = await self.bot.loop.run_in_executor(None, dice_stats, expr)
+        except DiceError as error:
+            await ctx.send(content=f'🎲 {error}')
+            return
+
+        await ctx.send(content=f'🎲 **{expr}**\n```\n{stats}\n```')
@@ -0,0 +1,450 @@
+#
+# cogs/general/sandbox.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+Evaluates calculator expressions in a pool of worker processes,
+so that something like 9**9**9 can't freeze the bot.
+'''
+
+import ast
+import asyncio
+import logging
+import math
+import multiprocessing
+import signal
+from functools import lru_cache
+
+import numpy as np
+import psutil
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'CalcError',
+    'CalcTimeout',
+    'CalcPool',
+]
+
+WORKERS = 2
+TIMEOUT = 3.0
+
+# Forking the bot while its other threads hold locks can leave the workers deadlocked
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Per-expression limits inside the workers
+CPU_LIMIT = 5
+MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Past this, integers are shown in scientific notation
+MAX_INT_BITS = 1000
+MAX_OUTPUT = 1000
+
+# Range evaluation
+MAX_POINTS = 5 * 10 ** 6
+DEFAULT_POINTS = 1001
+TABLE_ROWS = 11
+MAX_ROOTS = 5
+
+SAFE_BUILTINS = {
+    'abs': abs,
+    'complex': complex,
+    'divmod': divmod,
+    'float': float,
+    'int': int,
+    'max': max,
+    'min': min,
+    'pow': pow,
+    'round': round,
+    'sum': sum,
+}
+
+NAMESPACE = {name: getattr(math, name) for name in dir(math) if not name.startswith('_')}
+NAMESPACE.update(SAFE_BUILTINS)
+
+def _log(x, base=None):
+    if base is None:
+        return np.log(x)
+    return np.log(x) / np.log(base)
+
+# The same names, as ufuncs working on a whole array at once
+VECTOR_NAMESPACE = {
+    name: getattr(np, name) for name in (
+        'sqrt', 'exp', 'expm1', 'log10', 'log2', 'log1p',
+        'sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh', 'hypot',
+        'floor', 'ceil', 'trunc', 'fabs', 'fmod', 'copysign',
+        'degrees', 'radians', 'isnan', 'isinf', 'isfinite',
+        'pi', 'e', 'inf', 'nan',
+    )
+}
+VECTOR_NAMESPACE.update({
+    'acos': np.arccos,
+    'asin': np.arcsin,
+    'atan': np.arctan,
+    'atan2': np.arctan2,
+    'acosh': np.arccosh,
+    'asinh': np.arcsinh,
+    'atanh': np.arctanh,
+    'tau': 2 * np.pi,
+    'log': _log,
+    'abs': np.abs,
+    'pow': np.power,
+    'min': np.minimum,
+    'max': np.maximum,
+    'round': np.round,
+    'cbrt': np.cbrt,
+    'exp2': np.exp2,
+    'nextafter': np.nextafter,
+    'isclose': np.isclose,
+    'ulp': lambda x: np.spacing(np.abs(x)),
+    'int': np.trunc,
+    'float': lambda x: np.asarray(x, dtype=np.float64),
+})
+
+def _integral(func):
+    ''' For functions only defined on integers, gives nan for anything else '''
+
+    def wrapper(*args):
+        if not all(math.isfinite(arg) and arg == int(arg) for arg in args):
+            return math.nan
+        return func(*(int(arg) for arg in args))
+    return wrapper
+
+def _elementwise(func):
+    ''' Applies a scalar math function to each element, with nan or inf instead of errors '''
+
+    def call(*args):
+        try:
+            return float(func(*args))
+        except ValueError:
+            return math.nan
+        except OverflowError:
+            return math.inf
+    return np.vectorize(call, otypes=[np.float64])
+
+# Math functions NumPy doesn't have, done one element at a time
+ELEMENTWISE = {
+    'factorial': _integral(math.factorial),
+    'gamma': math.gamma,
+    'lgamma': math.lgamma,
+    'erf': math.erf,
+    'erfc': math.erfc,
+    'remainder': math.remainder,
+    'ldexp': lambda x, i: math.ldexp(x, int(i)),
+    'gcd': _integral(math.gcd),
+    'comb': _integral(getattr(math, 'comb', None)),
+    'perm': _integral(getattr(math, 'perm', None)),
+    'lcm': _integral(getattr(math, 'lcm', None)),
+    'isqrt': _integral(getattr(math, 'isqrt', None)),
+}
+VECTOR_NAMESPACE.update({
+    name: _elementwise(func) for name, func in ELEMENTWISE.items() if name in NAMESPACE
+})
+
+ALLOWED_NODES = frozenset((
+    # Structure
+    'Expression', 'Call', 'Name', 'Load', 'Constant', 'Num', 'Tuple', 'List',
+    'BinOp', 'UnaryOp', 'BoolOp', 'Compare', 'IfExp',
+
+    # Operators
+    'Add', 'Sub', 'Mult', 'Div', 'FloorDiv', 'Mod', 'Pow',
+    'LShift', 'RShift', 'BitAnd', 'BitOr', 'BitXor',
+    'UAdd', 'USub', 'Invert', 'Not', 'And', 'Or',
+    'Eq', 'NotEq', 'Lt', 'LtE', 'Gt', 'GtE',
+))
+
+class CalcError(ValueError):
+    pass
+
+class CalcTimeout(Exception):
+    pass
+
+def check_expression(expr, names=NAMESPACE):
+    ''' Parses the expression, only allowing arithmetic on numbers and calls to math functions '''
+
+    try:
+        tree = ast.parse(expr.strip(), mode='eval')
+    except SyntaxError as error:
+        raise CalcError(f'Invalid syntax: {error.msg}') from error
+
+    for node in ast.walk(tree):
+        kind = type(node).__name__
+        if kind not in ALLOWED_NODES:
+            raise CalcError(f'Not allowed: {kind}')
+
+        if kind == 'Constant' and not isinstance(node.value, (int, float, complex)):
+            raise CalcError(f'Not a number: {node.value!r}')
+        if kind == 'Name' and node.id not in names:
+            if node.id in NAMESPACE:
+                raise CalcError(f"{node.id} doesn't work over a range")
+            raise CalcError(f'Unknown name: {node.id}')
+        if kind == 'Call' and not isinstance(node.func, ast.Name):
+            raise CalcError('Only plain function calls are allowed')
+
+    return tree
+
+@lru_cache(maxsize=256)
+def compile_expression(expr, names=None):
+    return compile(check_expression(expr, names or NAMESPACE), '<calc>', 'eval')
+
+def format_result(result):
+    ''' Formats the result without building huge strings '''
+
+    if isinstance(result, bool):
+        return str(result)
+
+    if isinstance(result, int):
+        if result.bit_length() <= MAX_INT_BITS:
+            return str(result)
+
+        exponent = math.log10(abs(result))
+        mantissa = 10 ** (exponent - math.floor(exponent))
+        sign = '-' if result < 0 else ''
+        return f'{sign}{mantissa:.6f}e+{math.floor(exponent)} ({math.floor(exponent) + 1} digits)'
+
+    if isinstance(result, float):
+        if result == 0 or (math.isfinite(result) and 1e-4 <= abs(result) < 1e15):
+            return f'{result:.4f}'
+        return f'{result:.6e}'
+
+    result = str(result)
+    if len(result) > MAX_OUTPUT:
+        result = result[:MAX_OUTPUT] + '…'
+    return result
+
+# Worker process side
+def _init_worker(memory):
+    # The bot handles Ctrl-C, not the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if resource is not None:
+        # Only limit growth past what the worker needed to start up
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = psutil.Process().memory_info().vms + memory
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def _set_cpu_limit():
+    # RLIMIT_CPU counts the whole life of the process, so move it up each time
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = int(usage.ru_utime + usage.ru_stime) + CPU_LIMIT
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+
+def evaluate(expr):
+    code = compile_expression(expr)
+    if resource is not None:
+        _set_cpu_limit()
+
+    # pylint: disable=eval-used
+    result = eval(code, {'__builtins__': {}}, NAMESPACE)
+    return format_result(result)
+
+def _number(value):
+    if math.isfinite(value) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return f'{value:.6g}'
+
+def _sample_points(start, stop, points, exact=False):
+    ''' Gets the values to evaluate at, and whether they're every integer in the range.
+    With exact, a range of integers too long to do in full is an error instead of sampled.
+    '''
+
+    if points is None:
+        if start == int(start) and stop == int(stop):
+            count = abs(stop - start) + 1
+            if count <= MAX_POINTS:
+                step = 1 if stop >= start else -1
+                return np.arange(start, stop + step, step, dtype=np.float64), True
+            if exact:
+                raise CalcError(f'Range has {count:,.0f} values, the most is {MAX_POINTS:,} '
+                                f'(give n= to use a sample instead)')
+        points = DEFAULT_POINTS
+
+    if not 2 <= points <= MAX_POINTS:
+        raise CalcError(f'Number of points must be between 2 and {MAX_POINTS:,}')
+    return np.linspace(start, stop, points), False
+
+def _roots(xs, ys, finite):
+    ''' Finds where the function crosses zero, interpolating between samples.
+    Sign changes across a nan or infinity (like 1/x at 0) aren't roots.
+    '''
+
+    signs = np.sign(ys)
+    crossings = np.flatnonzero(
+        ((signs[:-1] * signs[1:] < 0) & finite[:-1] & finite[1:]) | (signs[:-1] == 0)
+    )
+    if signs[-1] == 0:
+        crossings = np.append(crossings, len(ys) - 1)
+
+    roots = []
+    for i in crossings[:MAX_ROOTS]:
+        if signs[i] == 0 or i + 1 == len(ys):
+            roots.append(xs[i])
+        else:
+            roots.append(xs[i] - ys[i] * (xs[i + 1] - xs[i]) / (ys[i + 1] - ys[i]))
+    return roots, len(crossings)
+
+def evaluate_range(expr, name, start, stop, *, points, mode):
+    ''' Evaluates the expression over the range in one pass with NumPy.
+    Returns a summary, with a sampled table in 'table' mode or the total in 'sum' mode.
+    '''
+
+    if resource is not None:
+        _set_cpu_limit()
+
+    # pylint: disable=eval-used
+    start = float(eval(compile_expression(start), {'__builtins__': {}}, NAMESPACE))
+    stop = float(eval(compile_expression(stop), {'__builtins__': {}}, NAMESPACE))
+    if not (math.isfinite(start) and math.isfinite(stop)):
+        raise CalcError(f'Range bounds have to be finite. '
+                        f'Usage: calc {mode} <expression> {name}=<start>..<stop> [n=<points>]')
+    xs, every = _sample_points(start, stop, points, exact=mode == 'sum')
+
+    names = frozenset(VECTOR_NAMESPACE) | {name}
+    code = compile_expression(expr, names)
+    with np.errstate(all='ignore'):
+        ys = eval(code, {'__builtins__': {}}, dict(VECTOR_NAMESPACE, **{name: xs}))
+        ys = np.broadcast_to(np.asarray(ys, dtype=np.float64), xs.shape)
+
+    finite = np.isfinite(ys)
+    lines = []
+    if mode == 'table':
+        width = max(len(name), 12)
+        lines.append(f'{name:>{width}}  f({name})')
+        for i in np.unique(np.linspace(0, len(xs) - 1, TABLE_ROWS).round().astype(int)):
+            lines.append(f'{_number(xs[i]):>{width}}  {_number(ys[i])}')
+        lines.append('')
+
+    if mode == 'sum':
+        sampled = '' if every else f' (of {len(xs):,} samples, not every value)'
+        lines.append(f'sum      {_number(ys[finite].sum())}{sampled}')
+
+    lines.append(f'points   {len(xs):,}')
+    if finite.any():
+        values = ys[finite]
+        low = np.flatnonzero(finite)[values.argmin()]
+        high = np.flatnonzero(finite)[values.argmax()]
+        lines.append(f'min      {_number(ys[low])} (at {name}={_number(xs[low])})')
+        lines.append(f'max      {_number(ys[high])} (at {name}={_number(xs[high])})')
+        lines.append(f'mean     {_number(values.mean())}')
+
+        roots, count = _roots(xs, ys, finite)
+        if roots:
+            more = f' (+{count - len(roots)} more)' if count > len(roots) else ''
+            roots = ', '.join(f'{name}≈{_number(root)}' for root in roots)
+            lines.append(f'roots    {roots}{more}')
+
+    if not finite.all():
+        lines.append(f'nan/inf  {len(ys) - np.count_nonzero(finite):,}')
+
+    return '\n'.join(lines)
+
+# Bot side
+class CalcPool:
+    ''' A pre-started pool of worker processes.
+    Expressions that run past the timeout take the pool down with them,
+    and a fresh one is started in its place. Anything else still running
+    in the old pool fails, since its results will never come back.
+    '''
+
+    __slots__ = (
+        'loop',
+        'workers',
+        'timeout',
+        'pool',
+        'pending',
+    )
+
+    def __init__(self, loop, workers=WORKERS, timeout=TIMEOUT):
+        self.loop = loop
+        self.workers = workers
+        self.timeout = timeout
+        self.pool = None
+        self.pending = set()
+
+    def start(self):
+        context = multiprocessing.get_context(START_METHOD)
+        # pylint: disable=consider-using-with
+        # It lives until close() or a timeout replaces it, not for a block
+        self.pool = context.Pool(self.workers, _init_worker, (MEMORY_LIMIT,))
+
+        # Have every worker import and set up before the first real expression
+        self.pool.map_async(evaluate, ['0'] * self.workers)
+        logger.info(f'Started {self.workers} calc worker(s)')
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    async def _restart(self):
+        pool, self.pool = self.pool, None
+        pending, self.pending = self.pending, set()
+        for future in pending:
+            if not future.done():
+                future.set_exception(CalcTimeout('Workers were restarted after another expression timed out'))
+
+        self.start()
+        await self.loop.run_in_executor(None, pool.terminate)
+
+    async def evaluate(self, expr):
+        ''' Evaluates the expression in a worker, returning the formatted result.
+        Raises CalcTimeout if it takes too long, or whatever the expression raised.
+        '''
+
+        return await self._run(evaluate, expr)
+
+    async def evaluate_range(self, expr, name, start, stop, *, points=None, mode='table'):
+        ''' Like evaluate(), but over a range of values for the given variable '''
+
+        return await self._run(evaluate_range, expr, name, start, stop, points=points, mode=mode)
+
+    async def _run(self, func, *args, **kwargs):
+        if self.pool is None:
+            self.start()
+
+        pool = self.pool
+        future = self.loop.create_future()
+
+        def resolve(result):
+            if not future.done():
+                future.set_result(result)
+
+        def reject(error):
+            if not future.done():
+                future.set_exception(error)
+
+        pool.apply_async(
+            func, args, kwargs,
+            callback=lambda result: self.loop.call_soon_threadsafe(resolve, result),
+            error_callback=lambda error: self.loop.call_soon_threadsafe(reject, error),
+        )
+        self.pending.add(future)
+
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as error:
+            # Another timeout may have already replaced the pool this ran in
+            if pool is self.pool:
+                logger.warning(f'Calc expression timed out, restarting workers: {args[0]!r}')
+                await self._restart()
+            raise CalcTimeout(f'Took longer than {self.timeout:g} seconds') from error
+        finally:
+            self.pending.discard(future)
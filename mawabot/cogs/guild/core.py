@@ -18,7 +18,7 @@ import re
 import discord
 from discord.ext import commands
 
-from mawabot.utils import normalize_caseless
+from mawabot.utils import did_you_mean
 
 ROLE_MENTION_REGEX = re.compile(r'<@&([0-9]+)>')
 
@@ -39,8 +39,7 @@ class Guild:
     def __unload(self):
         self.autonick_task.cancel()
 
-    @staticmethod
-    async def _get_role(guild, name):
+    async def _get_role(self, guild, name):
         id = None
 
         if name == 'everyone':
@@ -54,15 +53,9 @@ class Guild:
                 id = int(match[1])
 
         if id is None:
-            name = name.lower()
-            for role in guild.roles:
-                if role.name.lower() == name:
-                    return role
+            return self.bot.names.find_role(name, guild)
         else:
-            for role in guild.roles:
-                if role.id == id:
-                    return role
-        return None
+            return self.bot.names.get_role(id, guild)
 
     def _get_guild(self, ctx, name):
         if name is None:
@@ -71,11 +64,13 @@ class Guild:
         if name.isdigit():
             return self.bot.get_guild(int(name))
         else:
-            name = normalize_caseless(name)
-            for guild in self.bot.guilds:
-                if normalize_caseless(guild.name) == name:
-                    return guild
-        return None
+            return self.bot.names.find_guild(name)
+
+    def _no_such_guild(self, name):
+        desc = f'**No such guild:** {name}'
+        if not name.isdigit():
+            desc = f'{desc} {did_you_mean(self.bot.names.search_guilds(name))}'
+        return desc
 
     async def _autonick(self):
         delay = 5
@@ -220,7 +215,7 @@ class Guild:
         guild = self._get_guild(ctx, name)
 
         if guild is None:
-            desc = f'**No such guild:** {name}'
+            desc = self._no_such_guild(name)
             embed = discord.Embed(type='rich', description=desc, color=discord.Color.red())
         else:
             def fmt_role(role):
@@ -252,7 +247,7 @@ class Guild:
         guild = self._get_guild(ctx, name)
 
         if guild is None:
-            desc = f'**No such guild:** {name}'
+            desc = self._no_such_guild(name)
             embed = discord.Embed(type='rich', description=desc, color=discord.Color.red())
         else:
             def fmt_chan(chan):
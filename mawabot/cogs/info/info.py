@@ -19,7 +19,7 @@ from pprint import pformat
 import discord
 from discord.ext import commands
 
-from mawabot.utils import normalize_caseless
+from mawabot.utils import did_you_mean
 
 __all__ = [
     'Information',
@@ -58,6 +58,7 @@ class Information:
             names = ['me']
 
         uids = []
+        missing = []
         for name in names:
             if name == 'me' or name == 'myself':
                 uids.append(self.bot.user.id)
@@ -69,13 +70,15 @@ class Information:
             elif name.isdigit():
                 uid = int(name)
             else:
-                nname = normalize_caseless(name)
-                uid = discord.utils.find(lambda u, n=nname: normalize_caseless(u.name) == n, self.bot.users)
+                uid = self.bot.names.find_user(name)
+                if uid is None:
+                    missing.append((name, self.bot.names.search_users(name)))
+                    continue
 
             uids.append(uid)
 
         profiles = await asyncio.gather(*[self._get_profile(uid) for uid in uids])
-        return list(filter(lambda t: t[1] is not None, profiles))
+        return list(filter(lambda t: t[1] is not None, profiles)), missing
 
     @staticmethod
     def _connected_accounts(connected_accounts):
@@ -127,10 +130,16 @@ class Information:
     async def user_info(self, ctx, *names: str):
         ''' Gets information about the given user(s) '''
 
-        profiles = await self._get_profiles(names)
-        if not profiles:
-            embed = discord.Embed(type='rich', description='No user profiles found.')
+        profiles, missing = await self._get_profiles(names)
+        if missing:
+            lines = [f'**No such user:** {name} {did_you_mean(suggestions)}' for name, suggestions in missing]
+            embed = discord.Embed(type='rich', description='\n'.join(lines), color=discord.Color.red())
             await ctx.send(embed=embed)
+
+        if not profiles:
+            if not missing:
+                embed = discord.Embed(type='rich', description='No user profiles found.')
+                await ctx.send(embed=embed)
             return
 
         for profile, user in profiles:
@@ -286,6 +295,9 @@ class Information:
     async def snowflake(self, ctx, *ids: int):
         ''' Gets information about the given snowflake(s) '''
 
+        archive = self.bot.archive
+        messages = await archive.get_many(ids) if archive is not None else {}
+
         tasks = []
         for id in ids:
             embed = discord.Embed(type='rich')
@@ -313,7 +325,15 @@ class Information:
                 text = f'{emoji} ({emoji.name}) from "{channel.guild.name}"'
                 embed.add_field(name='Emoji:', value=text)
 
-            # Can't do get_message() since we're not a true bot
+            # Can't do get_message() since we're not a true bot,
+            # but it might be in the archive
+            msg = messages.get(id)
+            if msg:
+                channel = self.bot.get_channel(msg.channel_id)
+                where = channel.mention if channel else f'channel {msg.channel_id}'
+                content = msg.content if len(msg.content) < 200 else msg.content[:200] + '…'
+                text = f'By {msg.author_name} in {where}\n{content}'
+                embed.add_field(name='Message:', value=text)
 
             tasks.append(ctx.send(embed=embed))
 
@@ -21,6 +21,7 @@ import discord
 from discord.ext import commands
 
 from mawabot import __version__ as version
+from mawabot.utils import paginate
 
 REPO = 'strinking/mawabot'
 GITHUB_URL = f'https://github.com/{REPO}'
@@ -64,7 +65,12 @@ class Stats:
                 f'Guilds: `{len(self.bot.guilds)}`',
                 f'Channels: `{channels}`',
                 f'Users: `{len(self.bot.users)}`',
-                f'Latency: `{self.bot.latency}s`',]
+                f'Latency: `{self.bot.latency}s`',
+                f'Output queue: `{self.bot.outbound.depth}`',]
+
+        reddit = self.bot.get_cog('Reddit')
+        if reddit is not None:
+            desc.append(f'Reddit API: `{reddit.limits.summary()}`')
 
         embed = discord.Embed(title='mawabot', url=GITHUB_URL, description='\n'.join(desc))
         git = []
@@ -88,3 +94,53 @@ class Stats:
         embed.add_field(name='System Info', value=f'CPU: `{cpu}%` Mem: `{mem:.2f} MiB`', inline=False)
 
         await ctx.send(embed=embed)
+
+    @commands.command()
+    async def startup(self, ctx):
+        ''' Shows where the time went while starting up '''
+
+        profiler = self.bot.profiler
+        if not profiler.enabled:
+            await ctx.message.edit(content='Startup profiling is off, run with `--profile-startup`')
+            return
+
+        pages = paginate(profiler.summary(), page_size=30)
+        await ctx.message.edit(content=f'**Startup profile** (full report in `{profiler.path}`)')
+        for page in pages:
+            await ctx.send(content=f'```\n{page}```')
+
+    @commands.command()
+    async def latency(self, ctx, *, command: str = None):
+        ''' Shows latency percentiles (ms) for all commands, or details for one '''
+
+        latencies = self.bot.latencies.commands
+        if command is not None:
+            histograms = latencies.get(command)
+            if histograms is None:
+                await ctx.message.edit(content=f'No latencies recorded for `{command}`')
+                return
+
+            lines = [f'{"":8} {"p50":>9} {"p95":>9} {"p99":>9} {"max":>9}']
+            for kind, hist in histograms.items():
+                p50, p95, p99 = (hist.percentile(pct) for pct in (50, 95, 99))
+                lines.append(f'{kind:8} {p50:9.1f} {p95:9.1f} {p99:9.1f} {hist.max:9.1f}')
+            count = histograms['handler'].count
+            await ctx.message.edit(content=f'**{command}** ({count} runs, ms)\n```\n' + '\n'.join(lines) + '```')
+            return
+
+        if not latencies:
+            await ctx.message.edit(content='No commands run yet')
+            return
+
+        # Slowest handlers first
+        ordered = sorted(latencies.items(), key=lambda item: item[1]['handler'].percentile(95), reverse=True)
+        lines = [f'{"command":16} {"count":>6} {"p50":>8} {"p95":>8} {"p99":>8} {"rest95":>8}']
+        for name, histograms in ordered:
+            hist = histograms['handler']
+            p50, p95, p99 = (hist.percentile(pct) for pct in (50, 95, 99))
+            rest = histograms['rest'].percentile(95)
+            lines.append(f'{name:16} {hist.count:6} {p50:8.1f} {p95:8.1f} {p99:8.1f} {rest:8.1f}')
+
+        await ctx.message.edit(content='**Command latencies** (handler time, ms)')
+        for page in paginate('\n'.join(lines), page_size=30):
+            await ctx.send(content=f'```\n{page}```')
@@ -18,7 +18,14 @@ import logging
 import discord
 from discord.ext import commands
 
-MAX_DELETE_POSTS = 80
+from mawabot.archive import ArchivedMessage
+from mawabot.recent import PER_CHANNEL
+
+from .fetch import fetch_messages
+from .purge import BulkDelete, DeleteFilter
+
+# How long to leave the final deletion status up
+STATUS_LINGER = 5
 
 logger = logging.getLogger(__name__)
 
@@ -31,18 +38,52 @@ class Messages:
         self.bot = bot
 
     # Helper methods
-    @staticmethod
-    async def _get_messages(channel, ids):
-        ''' Gets a list of the messages with the given IDs, in that order '''
-
-        messages = []
-        async for msg in channel.history():
+    def _parse_ids(self, ctx, ids):
+        ''' Reads "message ID" or "channel ID-message ID" (from shift-clicking Copy ID)
+        into a list of (channel, message ID)
+        '''
+
+        targets = []
+        for id in ids:
+            cid, _, mid = id.rpartition('-')
             try:
-                messages.append((ids.index(msg.id), msg))
+                channel = self.bot.get_channel(int(cid)) if cid else ctx.channel
+                mid = int(mid)
             except ValueError:
-                pass
+                logger.warning(f'Not a message ID: {id}')
+                continue
 
-        return map(lambda t: t[1], sorted(messages))
+            if channel is None:
+                logger.warning(f'Cannot find the channel with ID {cid}')
+                continue
+            targets.append((channel, mid))
+        return targets
+
+    async def _get_messages(self, targets):
+        ''' Gets the messages for a list of (channel, message ID), in that order, as ArchivedMessages.
+        Checks the archive first, in any channel, then fetches the rest
+        from their channels in as few requests as possible.
+        '''
+
+        archive = self.bot.archive
+        ids = [id for _, id in targets]
+        found = await archive.get_many(ids) if archive is not None else {}
+
+        by_channel = {}
+        for channel, id in targets:
+            if id not in found:
+                by_channel.setdefault(channel, []).append(id)
+
+        results = await asyncio.gather(*[
+            fetch_messages(channel, channel_ids) for channel, channel_ids in by_channel.items()
+        ])
+        for fetched in results:
+            for id, msg in fetched.items():
+                found[id] = ArchivedMessage.from_message(msg)
+                if archive is not None:
+                    archive.add(msg)
+
+        return [found[id] for id in ids if id in found]
 
     @staticmethod
     async def _hit(ctx, content):
@@ -99,25 +140,25 @@ class Messages:
         else:
             channel = ctx.channel
 
-        to_quote = await self._get_messages(channel, (id,))
+        to_quote = await self._get_messages([(channel, id)])
         for msg in to_quote:
             embed = discord.Embed(type='rich', description=msg.content)
-            embed.set_author(name=msg.author.display_name, icon_url=msg.author.avatar_url)
+            embed.set_author(name=msg.author_name, icon_url=msg.author_avatar)
             embed.timestamp = msg.created_at
 
             if msg.attachments:
-                urls = '\n'.join(attach.url for attach in msg.attachments)
+                urls = '\n'.join(msg.attachments)
                 embed.add_field(name='Attachments:', value=urls)
             tasks.append(ctx.send(embed=embed))
             tasks.append(self.bot.output_send(embed=embed))
         await asyncio.gather(*tasks)
 
     @commands.command()
-    async def dump(self, ctx, *ids: int):
-        ''' Outputs the literal contents of the given post(s) '''
+    async def dump(self, ctx, *ids: str):
+        ''' Outputs the literal contents of the given post(s), as "ID" or "channel ID-ID" '''
 
         tasks = [ctx.message.delete()]
-        to_copy = await self._get_messages(ctx.channel, ids)
+        to_copy = await self._get_messages(self._parse_ids(ctx, ids))
         for msg in to_copy:
             if msg.content:
                 content = '\n'.join((
@@ -135,47 +176,74 @@ class Messages:
                 content = '(Message is empty)'
 
             embed = discord.Embed(type='rich', description=content)
-            embed.set_author(name=msg.author.display_name, icon_url=msg.author.avatar_url)
+            embed.set_author(name=msg.author_name, icon_url=msg.author_avatar)
             embed.timestamp = msg.edited_at or msg.created_at
 
             if msg.attachments:
-                urls = '\n'.join(attach.url for attach in msg.attachments)
+                urls = '\n'.join(msg.attachments)
                 embed.add_field(name='Attachments:', value=urls)
             tasks.append(self.bot.output_send(embed=embed))
-            tasks += [self.bot.send(embed=embed) for embed in msg.embeds]
+            tasks += [self.bot.output_send(embed=embed) for embed in msg.get_embeds()]
         await asyncio.gather(*tasks)
 
-    @commands.command(aliases=['delet'])
-    async def delete(self, ctx, posts: int = 1):
-        ''' Deletes the last X posts you made, including the trigger '''
+    async def _my_messages(self, channel, before=None):
+        ''' My messages in the channel, newest first.
+        Starts from the recent message buffer and only reads history past it.
+        '''
 
-        if posts > MAX_DELETE_POSTS:
-            logger.error((f'Asked to delete {posts} posts which is greater than '
-                          f'the self-imposed limit of {MAX_DELETE_POSTS}'))
-            return
+        oldest = before
+        for msg in self.bot.recent.cached(channel.id, PER_CHANNEL):
+            if before is None or msg.id < before.id:
+                oldest = msg
+                yield msg
 
-        tasks = [ctx.message.delete()]
-        deleted = 0
-        async for msg in ctx.channel.history():
-            if msg.author == self.bot.user:
-                tasks.append(msg.delete())
-                deleted += 1
-                if deleted >= posts + 1:
-                    break
+        async for msg in channel.history(limit=None, before=oldest):
+            if msg.author.id == self.bot.user.id:
+                yield msg
 
-        await asyncio.gather(*tasks)
+    async def _bulk_delete(self, ctx, posts, filter, source=None):
+        ''' Deletes the messages, using the trigger as the status message, then deletes it too '''
 
-    @commands.command()
-    async def purge(self, ctx, posts: int = 1):
-        ''' Deletes the last X posts in the channel '''
+        logger.info(f'Deleting up to {posts} message(s) in {ctx.channel}')
+        engine = BulkDelete(self.bot, ctx.channel, ctx.message, filter, posts)
+        deleted = await engine.run(source)
+        logger.info(f'Deleted {deleted} message(s) in {ctx.channel}')
+
+        await asyncio.sleep(STATUS_LINGER)
+        await ctx.message.delete()
+
+    async def _parse_filter(self, ctx, filters):
+        ''' Parses the filter arguments, or shows what's wrong with them in the trigger '''
+
+        try:
+            return DeleteFilter.parse(self.bot, filters)
+        except ValueError as error:
+            await ctx.message.edit(content=f'Bad filter: `{error}`')
+            return None
 
-        if posts > MAX_DELETE_POSTS:
-            logger.error((f'Asked to delete {posts} posts which is greater than '
-                          f'the self-imposed limit of {MAX_DELETE_POSTS}'))
+    # The post count has to come before the filters to be optional
+    # pylint: disable=keyword-arg-before-vararg
+
+    @commands.command(aliases=['delet'])
+    async def delete(self, ctx, posts: int = 1, *filters: str):
+        ''' Deletes the last X posts you made, including the trigger.
+        Takes the same filters as purge, except author.
+        '''
+
+        filter = await self._parse_filter(ctx, filters)
+        if filter is None:
             return
 
-        tasks = []
-        async for msg in ctx.channel.history(limit=posts + 1):
-            tasks.append(msg.delete())
+        filter.authors = {self.bot.user.id}
+        before = discord.Object(filter.before) if filter.before else None
+        await self._bulk_delete(ctx, posts, filter, self._my_messages(ctx.channel, before))
 
-        await asyncio.gather(*tasks)
+    @commands.command()
+    async def purge(self, ctx, posts: int = 1, *filters: str):
+        ''' Deletes the last X posts in the channel, including the trigger.
+        Filters: author=<ID, mention or "me">, before=<ID>, after=<ID>, contains=<text>
+        '''
+
+        filter = await self._parse_filter(ctx, filters)
+        if filter is not None:
+            await self._bulk_delete(ctx, posts, filter)
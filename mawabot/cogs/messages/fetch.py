@@ -0,0 +1,99 @@
+#
+# cogs/messages/fetch.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Fetches messages by ID with as few history requests as possible '''
+import logging
+from collections import deque
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'fetch_messages',
+]
+
+# The most messages a single history(around=...) request returns
+WINDOW = 100
+
+# IDs more than this far apart in time never share a window
+CLUSTER_GAP = 24 * 60 * 60 * 1000
+
+MAX_REQUESTS = 50
+
+def _snowflake_ms(id):
+    return id >> 22
+
+def _clusters(ids):
+    ''' Splits sorted IDs wherever there's a big gap in time between them '''
+
+    clusters = []
+    for id in ids:
+        if clusters and _snowflake_ms(id) - _snowflake_ms(clusters[-1][-1]) <= CLUSTER_GAP:
+            clusters[-1].append(id)
+        else:
+            clusters.append([id])
+    return clusters
+
+def _nearest(cluster, target):
+    return min(cluster, key=lambda id: abs(id - target))
+
+async def fetch_messages(channel, ids):
+    ''' Gets the messages with the given IDs from the channel, as a dict by ID.
+    IDs are grouped into clusters by how close their timestamps are,
+    and each cluster costs one history(around=...) request centered on it.
+    Whatever the window didn't reach, on either side, gets a window of its own,
+    aimed using how much time the last window turned out to cover.
+    '''
+
+    # (IDs, snowflake to center the window near)
+    pending = deque((cluster, cluster[len(cluster) // 2]) for cluster in _clusters(sorted(set(ids))))
+    found = {}
+    requests = 0
+
+    while pending and requests < MAX_REQUESTS:
+        cluster, target = pending.popleft()
+        center = _nearest(cluster, target)
+
+        messages = []
+        async for msg in channel.history(limit=WINDOW, around=discord.Object(center)):
+            messages.append(msg)
+        requests += 1
+
+        wanted = set(cluster)
+        for msg in messages:
+            if msg.id in wanted:
+                found[msg.id] = msg
+                wanted.discard(msg.id)
+
+        if not messages:
+            continue
+
+        # IDs inside the window that weren't in it don't exist anymore,
+        # the ones past either end need another window. The center is always
+        # settled by its own window, so this always makes progress.
+        low = min(msg.id for msg in messages)
+        high = max(msg.id for msg in messages)
+        before = [id for id in cluster if id in wanted and id < low and id != center]
+        after = [id for id in cluster if id in wanted and id > high and id != center]
+        span = high - low
+        if before:
+            pending.append((before, low - span // 2))
+        if after:
+            pending.append((after, high + span // 2))
+
+    if pending:
+        missing = sum(len(cluster) for cluster, _ in pending)
+        logger.warning(f'Gave up on {missing} message(s) in {channel} after {requests} requests')
+
+    logger.debug(f'Fetched {len(found)} of {len(set(ids))} message(s) in {requests} request(s)')
+    return found
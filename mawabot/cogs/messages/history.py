@@ -78,10 +78,7 @@ class History:
         # Note: not using enumerate() since it doesn't work with async-iterators
         async for msg in ctx.channel.history(**params):
             if msg != ctx.message:
-                await asyncio.gather(
-                    call(i, msg),
-                    asyncio.sleep(0.2),
-                )
+                await call(i, msg)
                 i += 1
 
         await self.bot.output_send(content=f'Done running `{ctx.message.content}`')
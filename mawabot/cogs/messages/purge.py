@@ -0,0 +1,230 @@
+#
+# cogs/messages/purge.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Deletes messages in bulk, as fast as the rate limits allow '''
+import asyncio
+import logging
+import re
+import time
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'DeleteFilter',
+    'BulkDelete',
+]
+
+DELETE_PATH = '/channels/{channel_id}/messages/{message_id}'
+
+# How many candidates to read ahead of the deletions
+QUEUE_SIZE = 200
+
+# The most messages to look through, so a rare filter doesn't page through the whole channel
+MAX_SCAN = 10000
+
+# Edit the status message at most this often
+PROGRESS_INTERVAL = 2.0
+
+MENTION_REGEX = re.compile(r'<@!?([0-9]+)>')
+
+def _parse_id(param, value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{param} has to be an ID, not "{value}"') from None
+
+class DeleteFilter:
+    ''' Which messages to delete, from "key=value" arguments:
+    author=<ID, mention or "me">, before=<message ID>, after=<message ID>, contains=<text>
+    '''
+
+    __slots__ = (
+        'authors',
+        'before',
+        'after',
+        'contains',
+    )
+
+    def __init__(self, authors=None, before=None, after=None, contains=None):
+        self.authors = authors
+        self.before = before
+        self.after = after
+        self.contains = contains
+
+    @classmethod
+    def parse(cls, bot, args):
+        authors = set()
+        options = {}
+
+        for arg in args:
+            param, sep, value = arg.partition('=')
+            if not sep:
+                raise ValueError(f'Filters look like "key=value", not "{arg}"')
+
+            param = param.lower()
+            if param == 'author':
+                if value == 'me':
+                    authors.add(bot.user.id)
+                else:
+                    match = MENTION_REGEX.match(value)
+                    authors.add(_parse_id(param, match.group(1) if match else value))
+            elif param in ('before', 'after'):
+                options[param] = _parse_id(param, value)
+            elif param == 'contains':
+                options[param] = value.lower()
+            else:
+                raise ValueError(f'Unknown filter: {param}')
+
+        return cls(authors=authors or None, **options)
+
+    def matches(self, msg):
+        if self.authors is not None and msg.author.id not in self.authors:
+            return False
+        if self.before is not None and msg.id >= self.before:
+            return False
+        if self.after is not None and msg.id <= self.after:
+            return False
+        if self.contains is not None and self.contains not in msg.content.lower():
+            return False
+        return True
+
+class BulkDelete:
+    ''' Deletes up to a number of matching messages from a channel.
+    Candidates are streamed from history while deletions go through the
+    bot's RouteScheduler, so they are paced by the DELETE route's bucket
+    instead of all being fired at once. Progress goes into one status message.
+    '''
+
+    __slots__ = (
+        'bot',
+        'channel',
+        'status',
+        'filter',
+        'count',
+        'deleted',
+        'scanned',
+        'missing',
+        'failed',
+        'started',
+        'last_progress',
+    )
+
+    def __init__(self, bot, channel, status, filter, count):
+        self.bot = bot
+        self.channel = channel
+        self.status = status
+        self.filter = filter
+        self.count = count
+        self.deleted = 0
+        self.scanned = 0
+        self.missing = 0
+        self.failed = 0
+        self.started = None
+        self.last_progress = 0.0
+
+    def history(self):
+        before = discord.Object(self.filter.before) if self.filter.before else None
+        return self.channel.history(limit=MAX_SCAN, before=before)
+
+    async def run(self, source=None):
+        ''' Deletes the messages, and returns how many were deleted.
+        The messages to check come from the channel's history, or from source,
+        which has to be an async iterator of messages, newest first.
+        At most MAX_SCAN of them are checked.
+        '''
+
+        self.started = time.monotonic()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        reader = self.bot.loop.create_task(self._read(source or self.history(), queue))
+
+        try:
+            while True:
+                msg = await queue.get()
+                if msg is None:
+                    break
+
+                await self._delete(msg)
+                await self._progress()
+        except discord.Forbidden:
+            logger.error(f'Not allowed to delete messages in {self.channel}')
+            self.failed += 1
+        finally:
+            # The reader might be stuck on a full queue nobody is taking from anymore
+            reader.cancel()
+            await asyncio.wait([reader])
+
+        await self._progress(final=True)
+        return self.deleted
+
+    async def _read(self, source, queue):
+        found = 0
+        try:
+            async for msg in source:
+                if found >= self.count or self.scanned >= MAX_SCAN:
+                    break
+                self.scanned += 1
+                if self.filter.after is not None and msg.id <= self.filter.after:
+                    # Newest first, so nothing after this can match either
+                    break
+                if msg.id == self.status.id or not self.filter.matches(msg):
+                    continue
+
+                await queue.put(msg)
+                found += 1
+        except asyncio.CancelledError:  # pylint: disable=try-except-raise
+            # Before Python 3.8 it's an Exception, and would be caught below
+            raise
+        except Exception as error:
+            logger.error(f'Could not read messages to delete in {self.channel}', exc_info=error)
+
+        await queue.put(None)
+
+    async def _delete(self, msg):
+        try:
+            await self.bot.rest.request('DELETE', DELETE_PATH,
+                                        channel_id=self.channel.id, message_id=msg.id)
+        except discord.NotFound:
+            # Deleted while we were getting to it
+            self.missing += 1
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException as error:
+            logger.warning(f'Could not delete message {msg.id}', exc_info=error)
+            self.failed += 1
+        else:
+            self.deleted += 1
+
+    async def _progress(self, final=False):
+        now = time.monotonic()
+        if not final and now - self.last_progress < PROGRESS_INTERVAL:
+            return
+        self.last_progress = now
+
+        elapsed = now - self.started
+        done = self.deleted + self.missing + self.failed
+        rate = self.deleted / elapsed if elapsed else 0.0
+        content = (f'{"Deleted" if final else "Deleting..."} '
+                   f'{self.deleted}/{self.count} ({rate:.1f}/s)')
+        if self.missing or self.failed:
+            content += f', {self.missing} already gone, {self.failed} failed'
+        if final and done < self.count:
+            if self.scanned >= MAX_SCAN:
+                content += f', stopped after checking {self.scanned} messages'
+            else:
+                content += ', no more matching messages'
+
+        try:
+            await self.status.edit(content=content)
+        except discord.HTTPException as error:
+            logger.debug('Could not update deletion status', exc_info=error)
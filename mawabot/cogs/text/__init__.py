@@ -11,6 +11,7 @@
 #
 
 from .core import Text
+from .macros import Macros
 from .meme import Meme
 from .reddit import Reddit
 from .slashes import Slashes
@@ -21,6 +22,7 @@ __all__ = [
 
 def setup(bot):
     ''' Setup function to add cog to bot '''
+    bot.add_cog(Macros(bot))
     bot.add_cog(Meme(bot))
     bot.add_cog(Reddit(bot))
     bot.add_cog(Slashes(bot))
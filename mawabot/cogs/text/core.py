@@ -12,12 +12,11 @@
 
 ''' Has commands for text transformation '''
 import asyncio
-import codecs
-
-import upsidedown
 
 from discord.ext import commands
 
+from . import transforms
+
 __all__ = [
     'Text',
 ]
@@ -40,15 +39,11 @@ class Text:
         )
 
     async def _sep(self, ctx, posts_back):
-        count = 0
-        async for msg in ctx.channel.history():
-            if msg.author == self.bot.client:
-                count += 1
-                if count >= posts_back + 1:
-                    break
-
-        assert msg.author == self.bot.client
+        messages = await self.bot.recent.latest(ctx.channel, posts_back + 1)
+        if len(messages) <= posts_back:
+            return
 
+        msg = messages[posts_back]
         if not msg.content.startswith('.\n'):
             content = '.\n' + msg.content
             await msg.edit(content=content)
@@ -57,18 +52,18 @@ class Text:
     async def upsidedown(self, ctx, *, text: str):
         ''' Prints the given text upside down '''
 
-        result = upsidedown.transform(text)
+        result = transforms.upside_down(text)
         await ctx.message.edit(content=result)
 
     @commands.command()
     async def rot13(self, ctx, *, text: str):
         ''' Rot13's the given text '''
 
-        result = codecs.encode(text, 'rot_13')
+        result = transforms.rot13(text)
         await ctx.message.edit(content=result)
 
     @commands.command(aliases=['rev'])
     async def reverse(self, ctx, *, text: str):
         ''' Reverses the text given '''
 
-        await ctx.message.edit(content=text[::-1])
+        await ctx.message.edit(content=transforms.reverse(text))
@@ -0,0 +1,159 @@
+#
+# cogs/text/cowsay.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Draws cowsay speech balloons and cows without running cowsay '''
+import functools
+import logging
+import os
+import re
+import textwrap
+from string import Template
+
+__all__ = [
+    'CowError',
+    'cowsay',
+]
+
+logger = logging.getLogger(__name__)
+
+# Same defaults as cowsay itself
+WRAP_WIDTH = 40
+DEFAULT_EYES = 'oo'
+DEFAULT_TONGUE = '  '
+
+# Searched in order, after anything in $COWPATH
+COW_DIRS = (
+    '/usr/share/cowsay/cows',
+    '/usr/share/games/cowsay/cows',
+    '/usr/local/share/cows',
+    '/usr/local/share/cowsay/cows',
+)
+
+# So the usual cow works even when there are no cowfiles installed
+DEFAULT_COW = r'''
+$the_cow = <<"EOC";
+        $thoughts   ^__^
+         $thoughts  ($eyes)\\_______
+            (__)\\       )\\/\\
+             $tongue ||----w |
+                ||     ||
+EOC
+'''
+
+COW_NAME_REGEX = re.compile(r'^[\w\-]+$')
+HEREDOC_REGEX = re.compile(
+    r'\$the_cow\s*=\s*<<\s*(?P<quote>["\']?)(?P<tag>\w+)(?P=quote)\s*;?[^\n]*\n(?P<body>.*?)^(?P=tag)\s*$',
+    re.DOTALL | re.MULTILINE,
+)
+ASSIGN_REGEX = re.compile(r'^\s*\$(?P<name>\w+)\s*=\s*(?P<quote>["\'])(?P<value>.*?)(?P=quote)\s*;', re.MULTILINE)
+PERL_ESCAPE_REGEX = re.compile(r'\\(.)')
+
+class CowError(ValueError):
+    pass
+
+def _cow_dirs():
+    dirs = [path for path in os.environ.get('COWPATH', '').split(os.pathsep) if path]
+    dirs.extend(COW_DIRS)
+    return dirs
+
+def _unescape(match):
+    char = match.group(1)
+    # Keep escaped dollar signs literal once this is a Template
+    return '$$' if char == '$' else char
+
+def parse_cowfile(source):
+    ''' Turns the Perl in a cowfile into a Template and its extra variables.
+    Only the parts cowfiles actually use are understood: simple string
+    assignments, and the $the_cow heredoc.
+    '''
+
+    match = HEREDOC_REGEX.search(source)
+    if match is None:
+        raise CowError('No $the_cow in cowfile')
+
+    body = match.group('body')
+    if match.group('quote') == "'":
+        # Single quoted heredocs aren't interpolated
+        body = body.replace('$', '$$')
+    else:
+        body = PERL_ESCAPE_REGEX.sub(_unescape, body)
+
+    variables = {}
+    for assign in ASSIGN_REGEX.finditer(source[:match.start()]):
+        value = assign.group('value')
+        if assign.group('quote') == '"':
+            value = PERL_ESCAPE_REGEX.sub(r'\1', value)
+        variables[assign.group('name')] = value
+
+    return Template(body), variables
+
+@functools.lru_cache(maxsize=64)
+def load_cow(name):
+    ''' Finds and parses the named cowfile, once '''
+
+    if not COW_NAME_REGEX.match(name):
+        raise CowError(f'Invalid cow name: {name}')
+
+    for directory in _cow_dirs():
+        path = os.path.join(directory, f'{name}.cow')
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as fh:
+                source = fh.read()
+        except FileNotFoundError:
+            continue
+
+        logger.debug(f'Loaded cowfile {path}')
+        return parse_cowfile(source)
+
+    if name == 'default':
+        return parse_cowfile(DEFAULT_COW)
+
+    raise CowError(f'No such cow: {name}')
+
+def _wrap(text, width):
+    lines = []
+    for line in text.expandtabs(8).splitlines() or ['']:
+        lines.extend(textwrap.wrap(line, width) or [''])
+    return lines
+
+def balloon(text, think=False, width=WRAP_WIDTH):
+    lines = _wrap(text, width)
+    longest = max(len(line) for line in lines)
+
+    if think:
+        borders = [('(', ')')] * len(lines)
+    elif len(lines) == 1:
+        borders = [('<', '>')]
+    else:
+        borders = [('/', '\\')] + [('|', '|')] * (len(lines) - 2) + [('\\', '/')]
+
+    result = [' ' + '_' * (longest + 2)]
+    for (left, right), line in zip(borders, lines):
+        result.append(f'{left} {line.ljust(longest)} {right}')
+    result.append(' ' + '-' * (longest + 2))
+    return '\n'.join(result)
+
+def cowsay(text, cow='default', think=False, eyes=DEFAULT_EYES, tongue=DEFAULT_TONGUE):
+    ''' Renders the text in a balloon coming from the given cow '''
+
+    template, variables = load_cow(cow)
+    values = {
+        'eyes': eyes,
+        'tongue': tongue,
+    }
+    values.update(variables)
+    values['thoughts'] = 'o' if think else '\\'
+
+    return '\n'.join((
+        balloon(text, think),
+        template.safe_substitute(values).rstrip('\n'),
+    ))
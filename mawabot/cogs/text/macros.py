@@ -0,0 +1,146 @@
+#
+# cogs/text/macros.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Has commands for chaining text transforms, and saving chains as macros '''
+import logging
+import os
+
+import discord
+import yaml
+from discord.ext import commands
+
+from .transforms import TRANSFORMS, PipelineError, parse_pipeline, run_pipeline
+
+__all__ = [
+    'Macros',
+]
+
+MAX_MESSAGE = 2000
+
+logger = logging.getLogger(__name__)
+
+class Macros:
+    __slots__ = (
+        'bot',
+        'path',
+        'macros',
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.path = bot.config.get('macros-file')
+        self.macros = self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                macros = yaml.safe_load(fh) or {}
+        except (yaml.YAMLError, IOError) as error:
+            logger.error(f'Could not load macros from {self.path}', exc_info=error)
+            return {}
+
+        return {str(name).lower(): str(chain) for name, chain in macros.items()}
+
+    def _save(self):
+        if not self.path:
+            logger.warning('No macros file set in config, macros will be lost on restart')
+            return
+
+        # Write to the side and swap, so a crash can't leave a half-written file
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fh:
+            yaml.safe_dump(self.macros, fh, default_flow_style=False, allow_unicode=True)
+        os.replace(temp_path, self.path)
+
+    async def _apply(self, ctx, chain, text):
+        ''' Runs the text through the chain in memory, then makes a single edit '''
+
+        try:
+            content = run_pipeline(text, parse_pipeline(chain, self.macros))
+        except PipelineError as error:
+            logger.warning(f'Pipeline failed: {error}')
+            await self.bot.output_send(content=f'Pipeline failed: `{error}`')
+            return
+
+        if len(content) > MAX_MESSAGE:
+            logger.warning(f'Pipeline output is {len(content)} characters, too long to send')
+            await self.bot.output_send(content=f'Pipeline output is too long ({len(content)} characters)')
+            return
+
+        await ctx.message.edit(content=content)
+
+    @commands.command()
+    async def pipe(self, ctx, *, pipeline: str):
+        ''' Runs text through transforms with one edit: "text | rot13 | reverse | clap" '''
+
+        text, _, chain = pipeline.partition('|')
+        await self._apply(ctx, chain, text.strip())
+
+    @commands.group(invoke_without_command=True)
+    async def macro(self, ctx, name: str, *, text: str = ''):
+        ''' Runs a saved macro on the given text '''
+
+        await self._apply(ctx, name, text)
+
+    @macro.command(name='set')
+    async def macro_set(self, ctx, name: str, *, chain: str):
+        ''' Saves a chain of transforms as a macro: "macro set shout clap | regional_indicators" '''
+
+        name = name.lower()
+        try:
+            if name in TRANSFORMS or name in ('set', 'remove', 'list'):
+                raise PipelineError(f"'{name}' is already taken")
+            parse_pipeline(chain, dict(self.macros, **{name: chain}))
+        except PipelineError as error:
+            embed = discord.Embed(color=discord.Color.red(), description=f'```{error}```')
+            embed.set_author(name='Macro not saved')
+            await ctx.send(embed=embed)
+            return
+
+        logger.info(f'Saving macro {name}: {chain}')
+        self.macros[name] = chain
+        self._save()
+
+        embed = discord.Embed(color=discord.Color.green(), description=f'```{name}: {chain}```')
+        embed.set_author(name='Macro saved')
+        await ctx.send(embed=embed)
+
+    @macro.command(name='remove')
+    async def macro_remove(self, ctx, name: str):
+        ''' Deletes a saved macro '''
+
+        chain = self.macros.pop(name.lower(), None)
+        if chain is None:
+            embed = discord.Embed(color=discord.Color.red(), description=f'```{name}```')
+            embed.set_author(name='No such macro')
+            await ctx.send(embed=embed)
+            return
+
+        logger.info(f'Removing macro {name}')
+        self._save()
+
+        embed = discord.Embed(color=discord.Color.green(), description=f'```{name}: {chain}```')
+        embed.set_author(name='Macro removed')
+        await ctx.send(embed=embed)
+
+    @macro.command(name='list')
+    async def macro_list(self, ctx):
+        ''' Lists the saved macros, and the transforms they can use '''
+
+        macros = '\n'.join(f'{name}: {chain}' for name, chain in sorted(self.macros.items()))
+        embed = discord.Embed(type='rich', description=f'```{macros or "(none)"}```')
+        embed.set_author(name='Macros')
+        embed.add_field(name='Transforms:', value=', '.join(sorted(TRANSFORMS)))
+        await ctx.send(embed=embed)
@@ -17,10 +17,16 @@ import aiohttp
 import discord
 from discord.ext import commands
 
+from .reddit_auth import TokenManager, proxy_settings
+from .reddit_limits import RedditLimits, RedditRateLimited
+from .reddit_pool import ListingPool
+
 __all__ = [
     'Reddit',
 ]
 
+MAX_ATTEMPTS = 3
+
 logger = logging.getLogger(__name__)
 
 def check_reddit(func):
@@ -38,80 +44,71 @@ def check_reddit(func):
 class Reddit:
     __slots__ = (
         'bot',
-        'token',
+        'tokens',
         'session',
+        'pools',
+        'limits',
     )
 
     def __init__(self, bot):
         self.bot = bot
-        self.token = None
         self.session = aiohttp.ClientSession()
+        self.tokens = TokenManager(bot, self.session)
+        self.pools = {}
+        self.limits = RedditLimits()
 
     def __unload(self):
+        for pool in self.pools.values():
+            pool.close()
+        self.tokens.close()
         self.session.close()
 
-    def _headers(self):
-        assert self.token
-        return {'Authorization': f'bearer {self.token}',
+    @staticmethod
+    def _headers(token):
+        return {'Authorization': f'bearer {token}',
                 'User-Agent': 'mawabot/1 by aismallard & maware'}
 
     def _proxy(self):
-        reddit = self.bot.config['reddit']
+        return proxy_settings(self.bot.config['reddit'])
 
-        proxy = reddit['proxy']
-        if proxy is None:
-            logging.debug("Not using a proxy")
-            return {}
+    async def request(self, path, interactive=True):
+        ''' Gets a Reddit API resource, within the rate limit.
+        Prefetching should pass interactive=False, so commands go first.
+        Raises RedditRateLimited if Reddit keeps refusing the request.
+        '''
 
-        logging.debug(f"Using proxy: {proxy}")
-        proxy_auth = reddit['proxy-auth']
-        if proxy_auth is not None:
-            logging.debug("Proxy basic authentication specified")
-            proxy_auth = aiohttp.BasicAuth(proxy_auth['user'], proxy_auth['password'])
-
-        return {
-            'proxy': proxy,
-            'proxy_auth': proxy_auth,
-        }
-
-    async def request(self, path):
         url = 'https://oauth.reddit.com' + path
         logger.debug(f'Fetching reddit resource: {url}')
 
-        if self.token is None:
-            await self.refresh_token()
-
-        async with self.session.get(url, headers=self._headers(), **self._proxy()) as req:
-            if req.status == 401:
-                logger.debug('Reddit token out of date, refreshing...')
-                await self.refresh_token()
+        proxy = self._proxy()
+        token = await self.tokens.get()
+        refreshed = False
+        for _ in range(MAX_ATTEMPTS):
+            await self.limits.acquire(interactive)
+            async with self.session.get(url, headers=self._headers(token), **proxy) as req:
+                if req.status == 429:
+                    self.limits.block(req.headers)
+                    continue
+
+                self.limits.update(req.headers)
+                if req.status == 401 and not refreshed:
+                    # Try again with new token, through the same proxy
+                    logger.debug('Reddit token out of date, refreshing...')
+                    token = await self.tokens.invalidate(token)
+                    refreshed = True
+                    continue
 
-                # Try again with new token
-                async with self.session.get(url, headers=self._headers()) as req:
-                    req.raise_for_status()
-                    data = await req.json()
-            else:
                 req.raise_for_status()
-                data = await req.json()
+                return await req.json()
 
-        return data
-
-    async def refresh_token(self,):
-        logger.info('Getting new Reddit token')
-        reddit = self.bot.config['reddit']
-        async with self.session.post('https://www.reddit.com/api/v1/access_token',
-                                    auth=aiohttp.BasicAuth(reddit['app-id'], reddit['app-secret']),
-                                    data={'grant_type': 'client_credentials'},
-                                    **self._proxy()) as req:
-            req.raise_for_status()
-            data = await req.json()
-            self.token = data['access_token']
+        raise RedditRateLimited(f'Reddit is rate limiting requests, try again in {self.limits.reset_in:.0f}s')
 
     @staticmethod
-    def get_image(item, channel):
-        # Check if nsfw images is given and channel is a nsfw channel
-        nsfw = item['over_18']
+    def nsfw_ok(channel):
+        return isinstance(channel, discord.abc.PrivateChannel) or channel.is_nsfw()
 
+    @staticmethod
+    def get_image(item):
         resolutions = item['preview']['images'][0]['resolutions']
         image = resolutions[1]
         image['url'] = image['url'].replace('&amp;', '&')
@@ -122,44 +119,38 @@ class Reddit:
         embed.set_image(url=image['url'])
         embed.image.width = image['width']
         embed.image.height = image['height']
+        return embed
 
-        if nsfw:
-            safe = isinstance(channel, discord.abc.PrivateChannel) or channel.is_nsfw()
-        else:
-            safe = True
-
-        return embed, safe
-
-    async def try_sfw_image(self, path, channel, attempts=5):
-        assert attempts > 0
-        for _ in range(attempts):
-            items = await self.request(path)
-            item = items[0]['data']['children'][0]['data']
+    async def safe_or_react(self, ctx, subreddit):
+        ''' Posts an image from the subreddit's pool, only including NSFW ones in NSFW channels '''
 
-            embed, sfw_ok = self.get_image(item, channel)
-            if sfw_ok:
-                return embed
+        pool = self.pools.get(subreddit)
+        if pool is None:
+            pool = self.pools[subreddit] = ListingPool(subreddit, self.request, self.bot.loop)
 
-        return None
+        try:
+            item = await pool.take(self.nsfw_ok(ctx.channel))
+        except RedditRateLimited as error:
+            await self.bot.output_send(content=str(error))
+            await ctx.message.add_reaction('\N{HOURGLASS}')
+            return
 
-    async def safe_or_react(self, ctx, path, attempts=5):
-        embed = await self.try_sfw_image(path, ctx.channel, attempts)
-        if embed is not None:
-            await ctx.send(embed=embed)
+        if item is not None:
+            await ctx.send(embed=self.get_image(item))
         else:
             await ctx.message.add_reaction('\N{NO ONE UNDER EIGHTEEN SYMBOL}')
 
     @commands.command()
     @check_reddit
     async def headpat(self, ctx):
-        await self.safe_or_react(ctx, '/r/headpats/random')
+        await self.safe_or_react(ctx, 'headpats')
 
     @commands.command()
     @check_reddit
     async def megane(self, ctx):
-        await self.safe_or_react(ctx, '/r/megane/random')
+        await self.safe_or_react(ctx, 'megane')
 
     @commands.command()
     @check_reddit
     async def hentai(self, ctx):
-        await self.safe_or_react(ctx, '/r/hentai/random', attempts=1)
+        await self.safe_or_react(ctx, 'hentai')
@@ -0,0 +1,146 @@
+#
+# cogs/text/reddit_auth.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Keeps a Reddit OAuth token fresh for the Reddit cog '''
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+__all__ = [
+    'TokenManager',
+    'proxy_settings',
+]
+
+TOKEN_URL = 'https://www.reddit.com/api/v1/access_token'
+
+# Get a new token this many seconds before the old one runs out
+REFRESH_AHEAD = 300
+
+# Retry a failed background refresh after this many seconds
+RETRY_DELAY = 30
+
+logger = logging.getLogger(__name__)
+
+def proxy_settings(reddit):
+    ''' Gets the aiohttp proxy arguments from the reddit config section '''
+
+    proxy = reddit['proxy']
+    if proxy is None:
+        logger.debug('Not using a proxy')
+        return {}
+
+    logger.debug(f'Using proxy: {proxy}')
+    proxy_auth = reddit['proxy-auth']
+    if proxy_auth is not None:
+        logger.debug('Proxy basic authentication specified')
+        proxy_auth = aiohttp.BasicAuth(proxy_auth['user'], proxy_auth['password'])
+
+    return {
+        'proxy': proxy,
+        'proxy_auth': proxy_auth,
+    }
+
+class TokenManager:
+    ''' Holds the application-only token, and gets a new one before it expires.
+    Any number of callers waiting on a refresh share the one request.
+    '''
+
+    __slots__ = (
+        'bot',
+        'session',
+        'token',
+        'expires',
+        'pending',
+        'timer',
+    )
+
+    def __init__(self, bot, session):
+        self.bot = bot
+        self.session = session
+        self.token = None
+        self.expires = 0.0
+        self.pending = None
+        self.timer = None
+
+    @property
+    def valid(self):
+        return self.token is not None and time.monotonic() < self.expires
+
+    async def get(self):
+        ''' Gets a usable token, only waiting when there isn't one '''
+
+        if self.valid:
+            return self.token
+        return await self.refresh()
+
+    async def invalidate(self, token):
+        ''' Called when Reddit rejected the token, gets a new one.
+        If someone else already replaced it, that one is used as is.
+        '''
+
+        if token == self.token:
+            self.token = None
+            self.expires = 0.0
+        return await self.get()
+
+    async def refresh(self):
+        if self.pending is None:
+            self.pending = self.bot.loop.create_task(self._fetch())
+
+        # Shielded so one caller being cancelled doesn't cancel it for the rest
+        return await asyncio.shield(self.pending)
+
+    def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    async def _fetch(self):
+        logger.info('Getting new Reddit token')
+        reddit = self.bot.config['reddit']
+        try:
+            async with self.session.post(TOKEN_URL,
+                                         auth=aiohttp.BasicAuth(reddit['app-id'], reddit['app-secret']),
+                                         data={'grant_type': 'client_credentials'},
+                                         **proxy_settings(reddit)) as req:
+                req.raise_for_status()
+                data = await req.json()
+        finally:
+            self.pending = None
+
+        expires_in = data.get('expires_in', 3600)
+        self.token = data['access_token']
+        self.expires = time.monotonic() + expires_in
+        logger.debug(f'Reddit token expires in {expires_in} seconds')
+
+        self._schedule(max(expires_in - REFRESH_AHEAD, RETRY_DELAY))
+        return self.token
+
+    def _schedule(self, delay):
+        self.close()
+        self.timer = self.bot.loop.call_later(delay, self._background_refresh)
+
+    def _background_refresh(self):
+        self.timer = None
+        task = self.bot.loop.create_task(self.refresh())
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task):
+        if task.cancelled():
+            return
+
+        error = task.exception()
+        if error is not None:
+            logger.warning('Background Reddit token refresh failed', exc_info=error)
+            self._schedule(RETRY_DELAY)
@@ -0,0 +1,150 @@
+#
+# cogs/text/reddit_limits.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Paces Reddit API requests by the rate limit headers Reddit sends back '''
+import asyncio
+import logging
+import time
+
+__all__ = [
+    'RedditLimits',
+    'RedditRateLimited',
+]
+
+# Requests in each window that prefetching leaves for commands
+RESERVE = 20
+
+# How long to wait when Reddit says to slow down without saying for how long
+DEFAULT_BACKOFF = 10.0
+
+logger = logging.getLogger(__name__)
+
+class RedditRateLimited(Exception):
+    pass
+
+class RedditLimits:
+    ''' The request budget for the current rate limit window.
+    Commands only wait when the budget is gone. Prefetching waits for any
+    command that is waiting, keeps RESERVE requests back, and spreads the
+    rest evenly over the window.
+    '''
+
+    __slots__ = (
+        'remaining',
+        'used',
+        'reset_at',
+        'waiting',
+        'idle',
+        'requests',
+        'prefetches',
+        'ratelimited',
+    )
+
+    def __init__(self):
+        self.remaining = None
+        self.used = None
+        self.reset_at = 0.0
+        self.waiting = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.requests = 0
+        self.prefetches = 0
+        self.ratelimited = 0
+
+    @property
+    def limit(self):
+        if self.remaining is None:
+            return None
+        return self.used + self.remaining
+
+    @property
+    def reset_in(self):
+        return max(self.reset_at - time.monotonic(), 0.0)
+
+    def delay(self, interactive):
+        ''' Gets how long to wait before the next request of this kind '''
+
+        now = time.monotonic()
+        if self.remaining is None or now >= self.reset_at:
+            return 0.0
+
+        spare = self.remaining if interactive else self.remaining - RESERVE
+        if spare < 1:
+            return self.reset_at - now
+        if interactive:
+            return 0.0
+        return (self.reset_at - now) / (spare + 1)
+
+    async def acquire(self, interactive):
+        ''' Waits until a request can be sent, then counts it against the budget '''
+
+        if interactive:
+            self.waiting += 1
+            self.idle.clear()
+            try:
+                delay = self.delay(True)
+                if delay > 0:
+                    logger.info(f'Reddit request budget used up, waiting {delay:.1f}s')
+                    await asyncio.sleep(delay)
+            finally:
+                self.waiting -= 1
+                if not self.waiting:
+                    self.idle.set()
+        else:
+            while True:
+                await self.idle.wait()
+                delay = self.delay(False)
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.prefetches += 1
+
+        self.requests += 1
+        if self.remaining is not None:
+            self.remaining -= 1
+            self.used += 1
+
+    def update(self, headers):
+        remaining = headers.get('X-Ratelimit-Remaining')
+        if remaining is None:
+            return
+
+        self.remaining = float(remaining)
+        self.used = float(headers.get('X-Ratelimit-Used', 0))
+        self.reset_at = time.monotonic() + float(headers.get('X-Ratelimit-Reset', 0))
+
+    def block(self, headers):
+        ''' Called on a 429, holds everything back until Reddit says to try again '''
+
+        self.ratelimited += 1
+        self.update(headers)
+
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            seconds = float(retry_after)
+        elif self.remaining is not None and self.reset_in > 0:
+            seconds = self.reset_in
+        else:
+            seconds = DEFAULT_BACKOFF
+
+        logger.warning(f'Rate limited by Reddit, holding requests for {seconds:.1f}s')
+        self.used = (self.used or 0) + (self.remaining or 0)
+        self.remaining = 0
+        self.reset_at = time.monotonic() + seconds
+        return seconds
+
+    def summary(self):
+        if self.remaining is None:
+            return f'{self.requests} requests'
+
+        return (f'{self.used:.0f}/{self.limit:.0f} used, resets in {self.reset_in:.0f}s, '
+                f'{self.requests} requests ({self.prefetches} prefetch, {self.ratelimited} rate limited)')
@@ -0,0 +1,195 @@
+#
+# cogs/text/reddit_pool.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Keeps a stock of image posts for each subreddit, so commands don't wait on Reddit '''
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+
+__all__ = [
+    'ListingPool',
+]
+
+# Listings to fill from, in turn. Each one is paged through with "after".
+SOURCES = (
+    'hot',
+    'top?t=all',
+)
+
+# Refill once a pool has fewer posts than this. SFW and NSFW posts
+# each stop being added past the maximum, so one can't crowd out the other.
+LOW_WATERMARK = 20
+MAX_POSTS = 300
+
+# How many served posts to remember, so they aren't shown again soon
+SEEN_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+def _usable(item):
+    ''' Whether the post has a preview image big enough to show '''
+
+    if item.get('stickied'):
+        return False
+
+    try:
+        return len(item['preview']['images'][0]['resolutions']) > 1
+    except (KeyError, IndexError):
+        return False
+
+class ListingPool:
+    ''' The posts of one subreddit that have previews and haven't been shown yet.
+    SFW and NSFW posts are kept apart, so a SFW channel never has to skip any.
+    Prefetching is paced behind commands, so a command that finds the pool empty
+    makes its own fetch instead of waiting on the prefetch.
+    '''
+
+    __slots__ = (
+        'subreddit',
+        'request',
+        'loop',
+        'safe',
+        'nsfw',
+        'seen',
+        'cursors',
+        'source',
+        'task',
+        'urgent',
+    )
+
+    def __init__(self, subreddit, request, loop):
+        self.subreddit = subreddit
+        self.request = request
+        self.loop = loop
+        self.safe = []
+        self.nsfw = []
+        self.seen = OrderedDict()
+        self.cursors = dict.fromkeys(SOURCES)
+        self.source = 0
+        self.task = None
+        self.urgent = None
+
+    def __len__(self):
+        return len(self.safe) + len(self.nsfw)
+
+    def close(self):
+        for task in (self.task, self.urgent):
+            if task is not None:
+                task.cancel()
+        self.task = None
+        self.urgent = None
+
+    async def take(self, nsfw_ok):
+        ''' Gets a random unseen post, or None if there aren't any this channel can show.
+        Only waits on Reddit when the pool is empty, usually the first time.
+        '''
+
+        if not self._count(nsfw_ok):
+            await self.refill()
+
+        item = self._pop(nsfw_ok)
+        if self._count(nsfw_ok) < LOW_WATERMARK:
+            self.start_refill()
+        return item
+
+    def _count(self, nsfw_ok):
+        return len(self.safe) + len(self.nsfw) if nsfw_ok else len(self.safe)
+
+    def _pop(self, nsfw_ok):
+        count = self._count(nsfw_ok)
+        if not count:
+            return None
+
+        index = random.randrange(count)
+        if index < len(self.safe):
+            posts = self.safe
+        else:
+            posts, index = self.nsfw, index - len(self.safe)
+
+        # Swap with the end so removal is O(1)
+        posts[index], posts[-1] = posts[-1], posts[index]
+        item = posts.pop()
+
+        self.seen[item['id']] = None
+        if len(self.seen) > SEEN_SIZE:
+            self.seen.popitem(last=False)
+        return item
+
+    def start_refill(self):
+        ''' Starts prefetching more posts, unless that's already happening '''
+
+        if self.task is None and self.urgent is None:
+            self.task = self.loop.create_task(self._refill(False))
+            self.task.add_done_callback(self._prefetch_done)
+
+    async def refill(self):
+        ''' Fetches more posts for a command, with the priority of one '''
+
+        if self.urgent is None:
+            self.urgent = self.loop.create_task(self._refill(True))
+            self.urgent.add_done_callback(self._urgent_done)
+
+        # Shielded so a cancelled command doesn't cancel the fetch for everyone else
+        await asyncio.shield(self.urgent)
+
+    def _prefetch_done(self, task):
+        self.task = None
+
+    def _urgent_done(self, task):
+        self.urgent = None
+        if not task.cancelled():
+            # Marks the error as seen, in case whoever was waiting went away
+            task.exception()
+
+    async def _refill(self, interactive):
+        try:
+            await self._fetch_page(interactive)
+        except Exception as error:
+            logger.warning(f'Could not refill posts for /r/{self.subreddit}', exc_info=error)
+            if interactive:
+                # Someone is waiting on this, so let them know why there's nothing
+                raise
+
+    async def _fetch_page(self, interactive):
+        name = SOURCES[self.source]
+        self.source = (self.source + 1) % len(SOURCES)
+
+        after = self.cursors[name]
+        separator = '&' if '?' in name else '?'
+        path = f'/r/{self.subreddit}/{name}{separator}limit=100'
+        if after is not None:
+            path += f'&after={after}'
+
+        listing = await self.request(path, interactive=interactive)
+        data = listing['data']
+
+        # Start over from the top once a listing runs out
+        self.cursors[name] = data.get('after')
+
+        pooled = {item['id'] for item in self.safe}
+        pooled.update(item['id'] for item in self.nsfw)
+        added = 0
+        for child in data['children']:
+            item = child['data']
+            if item['id'] in pooled or item['id'] in self.seen or not _usable(item):
+                continue
+
+            posts = self.nsfw if item['over_18'] else self.safe
+            if len(posts) >= MAX_POSTS:
+                continue
+
+            posts.append(item)
+            pooled.add(item['id'])
+            added += 1
+
+        logger.debug(f'Added {added} post(s) to /r/{self.subreddit} from {name}, {len(self)} pooled')
@@ -12,6 +12,8 @@
 
 from discord.ext import commands
 
+from .transforms import TRANSFORMS
+
 __all__ = [
     'Slashes',
 ]
@@ -28,47 +30,47 @@ class Slashes:
     async def tableflip(self, ctx, *, text: str = ''):
         ''' (╯°□°）╯︵ ┻━┻ '''
 
-        content = text + r' (╯°□°）╯︵ ┻━┻'
+        content = TRANSFORMS['tableflip'](text)
         await ctx.message.edit(content=content)
 
     @commands.command()
     async def unflip(self, ctx, *, text: str = ''):
         ''' ┬──┬﻿ ノ( ゜-゜ノ) '''
 
-        content = text + ' ┬─┬﻿ ノ( ゜-゜ノ)'
+        content = TRANSFORMS['unflip'](text)
         await ctx.message.edit(content=content)
 
     @commands.command()
     async def justright(self, ctx, *, text: str = ''):
         ''' ✋😩👌 '''
 
-        content = text + r' ✋😩👌'
+        content = TRANSFORMS['justright'](text)
         await ctx.message.edit(content=content)
 
     @commands.command()
     async def culol(self, ctx, *, text: str = ''):
         ''' 😂 👌 '''
 
-        content = text + r' 😂 👌'
+        content = TRANSFORMS['culol'](text)
         await ctx.message.edit(content=content)
 
     @commands.command()
     async def shrug(self, ctx, *, text: str = ''):
         ''' ¯\\_(ツ)_/¯ '''
 
-        content = text + r' ¯\_(ツ)_/¯'
+        content = TRANSFORMS['shrug'](text)
         await ctx.message.edit(content=content)
 
     @commands.command()
     async def lenny(self, ctx, *, text: str = ''):
         ''' ( ͡° ͜ʖ ͡°) '''
 
-        content = text + ' ( ͡° ͜ʖ ͡°)'
+        content = TRANSFORMS['lenny'](text)
         await ctx.message.edit(content=content)
 
     @commands.command()
     async def wtf(self, ctx, *, text: str = ''):
         ''' ಠ_ಠ '''
 
-        content = text + ' ಠ_ಠ'
+        content = TRANSFORMS['wtf'](text)
         await ctx.message.edit(content=content)
@@ -0,0 +1,198 @@
+#
+# cogs/text/transforms.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+''' Pure text transformations, shared by the text commands and pipelines '''
+import codecs
+import random
+import re
+
+import upsidedown
+
+__all__ = [
+    'TRANSFORMS',
+    'PipelineError',
+    'parse_pipeline',
+    'run_pipeline',
+]
+
+DISCORD_STRINGS = re.compile(r'(<\S*>)')
+
+# How deep macros can refer to other macros
+MAX_DEPTH = 8
+
+REGIONAL_EMOJIS = {
+    'a': '\N{REGIONAL INDICATOR SYMBOL LETTER A}',
+    'b': '\N{REGIONAL INDICATOR SYMBOL LETTER B}',
+    'c': '\N{REGIONAL INDICATOR SYMBOL LETTER C}',
+    'd': '\N{REGIONAL INDICATOR SYMBOL LETTER D}',
+    'e': '\N{REGIONAL INDICATOR SYMBOL LETTER E}',
+    'f': '\N{REGIONAL INDICATOR SYMBOL LETTER F}',
+    'g': '\N{REGIONAL INDICATOR SYMBOL LETTER G}',
+    'h': '\N{REGIONAL INDICATOR SYMBOL LETTER H}',
+    'i': '\N{REGIONAL INDICATOR SYMBOL LETTER I}',
+    'j': '\N{REGIONAL INDICATOR SYMBOL LETTER J}',
+    'k': '\N{REGIONAL INDICATOR SYMBOL LETTER K}',
+    'l': '\N{REGIONAL INDICATOR SYMBOL LETTER L}',
+    'm': '\N{REGIONAL INDICATOR SYMBOL LETTER M}',
+    'n': '\N{REGIONAL INDICATOR SYMBOL LETTER N}',
+    'o': '\N{REGIONAL INDICATOR SYMBOL LETTER O}',
+    'p': '\N{REGIONAL INDICATOR SYMBOL LETTER P}',
+    'q': '\N{REGIONAL INDICATOR SYMBOL LETTER Q}',
+    'r': '\N{REGIONAL INDICATOR SYMBOL LETTER R}',
+    's': '\N{REGIONAL INDICATOR SYMBOL LETTER S}',
+    't': '\N{REGIONAL INDICATOR SYMBOL LETTER T}',
+    'u': '\N{REGIONAL INDICATOR SYMBOL LETTER U}',
+    'v': '\N{REGIONAL INDICATOR SYMBOL LETTER V}',
+    'w': '\N{REGIONAL INDICATOR SYMBOL LETTER W}',
+    'x': '\N{REGIONAL INDICATOR SYMBOL LETTER X}',
+    'y': '\N{REGIONAL INDICATOR SYMBOL LETTER Y}',
+    'z': '\N{REGIONAL INDICATOR SYMBOL LETTER Z}',
+    '0': '0\N{COMBINING ENCLOSING KEYCAP}',
+    '1': '1\N{COMBINING ENCLOSING KEYCAP}',
+    '2': '2\N{COMBINING ENCLOSING KEYCAP}',
+    '3': '3\N{COMBINING ENCLOSING KEYCAP}',
+    '4': '4\N{COMBINING ENCLOSING KEYCAP}',
+    '5': '5\N{COMBINING ENCLOSING KEYCAP}',
+    '6': '6\N{COMBINING ENCLOSING KEYCAP}',
+    '7': '7\N{COMBINING ENCLOSING KEYCAP}',
+    '8': '8\N{COMBINING ENCLOSING KEYCAP}',
+    '9': '9\N{COMBINING ENCLOSING KEYCAP}',
+    '!': '\N{HEAVY EXCLAMATION MARK SYMBOL}',
+    '?': '\N{BLACK QUESTION MARK ORNAMENT}',
+}
+
+# Name -> function(text) -> text
+TRANSFORMS = {}
+
+class PipelineError(ValueError):
+    pass
+
+def transform(*names):
+    ''' Registers a function under the given names '''
+
+    def register(func):
+        for name in names:
+            TRANSFORMS[name] = func
+        return func
+    return register
+
+# Text
+@transform('upsidedown', 'ud')
+def upside_down(text):
+    return upsidedown.transform(text)
+
+@transform('rot13')
+def rot13(text):
+    return codecs.encode(text, 'rot_13')
+
+@transform('reverse', 'rev')
+def reverse(text):
+    return text[::-1]
+
+# Meme
+def regional_indicators(text, big=False):
+    ''' Formats input text into regional indicators, leaving mentions and emojis alone '''
+
+    sep = ' ' if big else '\u200b'
+    def mapper(s):
+        if s.startswith('<'):
+            return s
+        return sep.join(REGIONAL_EMOJIS.get(c.lower(), c) for c in s)
+
+    return ''.join(map(mapper, DISCORD_STRINGS.split(text)))
+
+@transform('regional_indicators', 'ri')
+def regional_indicators_small(text):
+    return regional_indicators(text)
+
+@transform('regional_indicators_large', 'ril')
+def regional_indicators_large(text):
+    return regional_indicators(text, big=True)
+
+@transform('spacewords', 'sw')
+def spacewords(text):
+    return ' . '.join(' '.join(word) for word in text.split(' '))
+
+@transform('crossword', 'cw')
+def crossword(text):
+    text = text.upper()
+    lines = [text] + list(text[1:])
+    return '\n'.join(lines)
+
+@transform('kerrhau')
+def kerrhau(text):
+    text = text.split()
+    words = []
+
+    while text:
+        word = []
+
+        for _ in range(random.randint(1, 3)):
+            if text:
+                word.append(text.pop(0))
+
+        words.append(' '.join(word))
+
+    if not words:
+        return ''
+
+    last = words[-1][-1]
+    words[-1] = words[-1][:-1]
+    words.append(last)
+    return '\n'.join(words)
+
+@transform('clap')
+def clap(text):
+    return ' 👏 '.join(text.upper().split())
+
+@transform('clap2')
+def clap2(text):
+    return ''.join(f'👏 {word}' for word in text.upper().split()) + ' 👏'
+
+# Slashes
+def _suffix(name, suffix):
+    transform(name)(lambda text: text + suffix)
+
+_suffix('tableflip', r' (╯°□°）╯︵ ┻━┻')
+_suffix('unflip', ' ┬─┬\ufeff ノ( ゜-゜ノ)')
+_suffix('justright', r' ✋😩👌')
+_suffix('culol', r' 😂 👌')
+_suffix('shrug', r' ¯\_(ツ)_/¯')
+_suffix('lenny', ' ( ͡° ͜ʖ ͡°)')
+_suffix('wtf', ' ಠ_ಠ')
+
+# Pipelines
+def parse_pipeline(chain, macros=None, depth=0):
+    ''' Turns "rot13 | reverse | shrug" into a list of functions, expanding macros '''
+
+    if depth > MAX_DEPTH:
+        raise PipelineError('Macros nest too deeply (is one calling itself?)')
+
+    macros = macros or {}
+    funcs = []
+    for name in chain.split('|'):
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        if name in TRANSFORMS:
+            funcs.append(TRANSFORMS[name])
+        elif name in macros:
+            funcs += parse_pipeline(macros[name], macros, depth + 1)
+        else:
+            raise PipelineError(f'No such transform or macro: {name}')
+    return funcs
+
+def run_pipeline(text, funcs):
+    for func in funcs:
+        text = func(text)
+    return text
@@ -0,0 +1,162 @@
+#
+# exporter.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+exporter.py
+Serves the bot's metrics as a Prometheus text page on localhost
+'''
+
+import logging
+import os
+
+import psutil
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'MetricsServer',
+]
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9477
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsPage:
+    ''' Builds up the text exposition format, one metric family at a time '''
+
+    __slots__ = (
+        'lines',
+    )
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, type, help):
+        self.lines.append(f'# HELP mawabot_{name} {help}')
+        self.lines.append(f'# TYPE mawabot_{name} {type}')
+
+    def sample(self, name, value, **labels):
+        if labels:
+            labels = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+            self.lines.append(f'mawabot_{name}{{{labels}}} {value}')
+        else:
+            self.lines.append(f'mawabot_{name} {value}')
+
+    def single(self, name, type, help, value):
+        self.family(name, type, help)
+        self.sample(name, value)
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+class MetricsServer:
+    ''' aiohttp server answering GET /metrics '''
+
+    __slots__ = (
+        'bot',
+        'host',
+        'port',
+        'process',
+        'runner',
+    )
+
+    def __init__(self, bot, host=None, port=None):
+        self.bot = bot
+        self.host = host or DEFAULT_HOST
+        self.port = port or DEFAULT_PORT
+        self.process = psutil.Process(os.getpid())
+        self.runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f'Serving metrics on http://{self.host}:{self.port}/metrics')
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle(self, request):
+        return web.Response(text=self.render(), content_type='text/plain')
+
+    def render(self):
+        bot = self.bot
+        page = MetricsPage()
+
+        page.single('uptime_seconds', 'gauge', 'Time since the bot started.',
+                    bot.uptime.total_seconds())
+        page.single('gateway_latency_seconds', 'gauge', 'Latency between a heartbeat and its ack.',
+                    bot.latency)
+        page.single('event_loop_lag_seconds', 'gauge', 'How late the event loop last woke up.',
+                    bot.loop_lag.last)
+        page.single('event_loop_lag_max_seconds', 'gauge', 'Worst event loop lag seen.',
+                    bot.loop_lag.max)
+        if bot.watchdog is not None:
+            page.single('event_loop_stalls_total', 'counter', 'Times the watchdog caught the loop blocked.',
+                        bot.watchdog.stalls)
+
+        # Gateway events
+        page.family('events_total', 'counter', 'Gateway events dispatched, by type.')
+        for event, count in sorted(bot.counters.events.items()):
+            page.sample('events_total', count, event=event)
+
+        # Commands
+        page.family('commands_total', 'counter', 'Commands run, by name.')
+        for command, histograms in sorted(bot.latencies.commands.items()):
+            page.sample('commands_total', histograms['handler'].count, command=command)
+
+        page.family('command_duration_seconds', 'summary', 'Time spent in command handlers.')
+        for command, histograms in sorted(bot.latencies.commands.items()):
+            hist = histograms['handler']
+            for pct in (50, 95, 99):
+                page.sample('command_duration_seconds', hist.percentile(pct) / 1000,
+                            command=command, quantile=pct / 100)
+            page.sample('command_duration_seconds_sum', hist.total / 1000, command=command)
+            page.sample('command_duration_seconds_count', hist.count, command=command)
+
+        # REST
+        page.single('rest_requests_total', 'counter', 'REST requests made through discord.py.',
+                    bot.counters.rest_requests)
+        page.family('rest_errors_total', 'counter', 'Failed REST requests through discord.py, by status.')
+        for status, count in sorted(bot.counters.rest_errors.items(), key=str):
+            page.sample('rest_errors_total', count, status=status)
+        page.single('scheduled_requests_total', 'counter', 'REST requests made by the route scheduler, also counted above.',
+                    bot.rest.requests)
+        page.single('ratelimited_total', 'counter', '429 responses retried by discord.py.',
+                    bot.counters.ratelimited)
+        page.single('output_queue_depth', 'gauge', 'Items waiting to be sent to the output channel.',
+                    bot.outbound.depth)
+        page.single('output_failed_total', 'counter', 'Queued output items that could not be sent.',
+                    bot.outbound.items_failed)
+
+        # Cache
+        page.single('cached_guilds', 'gauge', 'Guilds in the cache.', len(bot.guilds))
+        page.single('cached_channels', 'gauge', 'Guild channels in the cache.',
+                    sum(1 for _ in bot.get_all_channels()))
+        page.single('cached_users', 'gauge', 'Users in the cache.', len(bot.users))
+
+        # Process
+        with self.process.oneshot():
+            cpu = self.process.cpu_times()
+            rss = self.process.memory_info().rss
+        page.single('process_cpu_seconds_total', 'counter', 'User and system CPU time.',
+                    cpu.user + cpu.system)
+        page.single('process_resident_memory_bytes', 'gauge', 'Resident set size.', rss)
+
+        return page.render()
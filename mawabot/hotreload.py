@@ -0,0 +1,154 @@
+#
+# hotreload.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+hotreload.py
+Tracks cog submodules so only the changed ones are re-imported
+'''
+
+import ast
+import hashlib
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'ModuleTracker',
+]
+
+def _digest(path):
+    with open(path, 'rb') as fh:
+        return hashlib.sha1(fh.read()).hexdigest()
+
+def _imports(module):
+    ''' Gets the names of every module the given module's source imports '''
+
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return set()
+
+    with open(path, encoding='utf-8') as fh:
+        tree = ast.parse(fh.read(), path)
+
+    # Relative imports are resolved against the containing package
+    package = module.__name__ if hasattr(module, '__path__') else module.__name__.rpartition('.')[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package.rsplit('.', node.level - 1)[0] if node.level > 1 else package
+                base = f'{base}.{node.module}' if node.module else base
+            else:
+                base = node.module
+
+            # "from . import x" may name a submodule rather than an attribute
+            names.add(base)
+            names.update(f'{base}.{alias.name}' for alias in node.names)
+    return names
+
+class ModuleTracker:
+    ''' Remembers the file state and dependencies of each extension's modules '''
+
+    __slots__ = (
+        'files',
+        'depends',
+    )
+
+    def __init__(self):
+        # module name -> (mtime, sha1)
+        self.files = {}
+        # module name -> modules in the same extension it imports
+        self.depends = {}
+
+    @staticmethod
+    def modules(extension):
+        ''' Gets the names of all loaded modules that belong to the extension '''
+
+        prefix = extension + '.'
+        return [name for name in sys.modules if name == extension or name.startswith(prefix)]
+
+    def snapshot(self, extension):
+        ''' Records the current state of the extension's modules, called after it loads '''
+
+        names = set(self.modules(extension))
+        for name in names:
+            module = sys.modules[name]
+            path = getattr(module, '__file__', None)
+            if path is None:
+                continue
+
+            try:
+                self.files[name] = (os.path.getmtime(path), _digest(path))
+                self.depends[name] = _imports(module) & names
+            except (OSError, SyntaxError) as error:
+                logger.debug(f'Cannot track {name}', exc_info=error)
+
+    def stale(self, extension):
+        ''' Gets the extension's modules whose files changed since the last snapshot '''
+
+        stale = set()
+        for name in self.modules(extension):
+            state = self.files.get(name)
+            if state is None:
+                continue
+
+            mtime, digest = state
+            path = sys.modules[name].__file__
+            try:
+                new_mtime = os.path.getmtime(path)
+                if new_mtime == mtime:
+                    continue
+
+                # Touched, but only reload if the contents differ
+                new_digest = _digest(path)
+            except OSError:
+                stale.add(name)
+                continue
+
+            if new_digest == digest:
+                self.files[name] = (new_mtime, digest)
+            else:
+                stale.add(name)
+        return stale
+
+    def reload_order(self, extension, stale):
+        ''' Gets the stale modules plus everything depending on them, dependencies first '''
+
+        names = set(self.modules(extension))
+        affected = set(stale)
+        changed = True
+        while changed:
+            changed = False
+            for name in names - affected:
+                if self.depends.get(name, set()) & affected:
+                    affected.add(name)
+                    changed = True
+
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order or name in visiting:
+                return
+            visiting.add(name)
+            for dep in sorted(self.depends.get(name, ())):
+                if dep in affected:
+                    visit(dep)
+            order.append(name)
+
+        for name in sorted(affected):
+            visit(name)
+        return order
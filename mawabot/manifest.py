@@ -0,0 +1,89 @@
+#
+# manifest.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+manifest.py
+Finds which commands a cog provides without importing it
+'''
+
+import ast
+import logging
+import os
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'CogManifest',
+    'scan_cog',
+]
+
+CogManifest = namedtuple('CogManifest', ('commands', 'eager'))
+
+def _command_names(func):
+    ''' Gets the name and aliases of a function decorated with commands.command() or commands.group() '''
+
+    for decorator in func.decorator_list:
+        if not isinstance(decorator, ast.Call):
+            continue
+
+        target = decorator.func
+        if not (isinstance(target, ast.Attribute)
+                and isinstance(target.value, ast.Name)
+                and target.value.id == 'commands'
+                and target.attr in ('command', 'group')):
+            continue
+
+        names = [func.name]
+        for keyword in decorator.keywords:
+            if keyword.arg == 'name':
+                names[0] = ast.literal_eval(keyword.value)
+            elif keyword.arg == 'aliases':
+                names.extend(ast.literal_eval(keyword.value))
+        return names
+    return ()
+
+def _needs_eager(tree):
+    ''' Cogs with event listeners or message triggers have to be loaded up front, or they would miss events '''
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith('on_'):
+                    return True
+        elif isinstance(node, ast.Attribute) and node.attr in ('add_listener', 'add_trigger'):
+            return True
+    return False
+
+def scan_cog(path):
+    ''' Parses every module in the cog package at path and returns its manifest '''
+
+    commands = set()
+    eager = False
+
+    for filename in sorted(os.listdir(path)):
+        if not filename.endswith('.py'):
+            continue
+
+        with open(os.path.join(path, filename), encoding='utf-8') as fh:
+            tree = ast.parse(fh.read(), filename)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef):
+                for item in node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        commands.update(_command_names(item))
+
+        eager = eager or _needs_eager(tree)
+
+    logger.debug(f'Manifest for {path}: {len(commands)} commands, eager: {eager}')
+    return CogManifest(frozenset(commands), eager)
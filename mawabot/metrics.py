@@ -0,0 +1,347 @@
+#
+# metrics.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+metrics.py
+Keeps counters and latency histograms for commands, events and REST calls
+'''
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from datetime import timezone
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'Counters',
+    'Histogram',
+    'LatencyTracker',
+    'LoopLag',
+    'PingTracker',
+    'RateLimitCounter',
+    'RollingWindow',
+    'instrument_http',
+]
+
+# Buckets grow by 10% each, from 10 µs to 10 minutes,
+# so any percentile is within 10% of the real value.
+MIN_MS = 0.01
+MAX_MS = 600000.0
+GROWTH = 1.1
+BUCKETS = int(math.log(MAX_MS / MIN_MS, GROWTH)) + 2
+LOG_GROWTH = math.log(GROWTH)
+
+PERCENTILES = (50, 95, 99)
+KINDS = ('delay', 'handler', 'rest')
+
+# Seconds spent in REST calls by the current command, see instrument_http()
+REST_TIME = ContextVar('rest_time', default=None)
+
+# How discord.py logs a 429 it is about to retry
+RATELIMIT_MESSAGE = 'We are being rate limited.'
+
+EDIT_PATH = '/channels/{channel_id}/messages/{message_id}'
+
+# How many messages to remember the event delay of, for ping to look up its own
+ARRIVALS_SIZE = 50
+
+def _bucket_bound(index):
+    ''' Upper bound of the given bucket, in milliseconds '''
+    return MIN_MS * GROWTH ** index
+
+class Histogram:
+    ''' Fixed-size histogram with logarithmic buckets, in milliseconds '''
+
+    __slots__ = (
+        'counts',
+        'count',
+        'total',
+        'max',
+    )
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms):
+        if ms <= MIN_MS:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(ms / MIN_MS) / LOG_GROWTH)), BUCKETS - 1)
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0.0
+
+        target = math.ceil(self.count * pct / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                if index == BUCKETS - 1:
+                    # Anything past MAX_MS lands here, so the bound doesn't hold
+                    return self.max
+                return min(_bucket_bound(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        data = {f'p{pct}': self.percentile(pct) for pct in PERCENTILES}
+        data.update({
+            'count': self.count,
+            'mean': self.mean,
+            'max': self.max,
+            'buckets': {f'{_bucket_bound(i):.4g}': n for i, n in enumerate(self.counts) if n},
+        })
+        return data
+
+class LatencyTracker:
+    ''' Per-command histograms of:
+    - delay: message creation (from its snowflake) to the handler starting
+    - handler: how long the command took to run
+    - rest: total time spent waiting on REST calls while it ran
+    '''
+
+    __slots__ = (
+        'commands',
+    )
+
+    def __init__(self):
+        self.commands = {}
+
+    def record(self, command, delay, handler, rest):
+        histograms = self.commands.get(command)
+        if histograms is None:
+            histograms = self.commands[command] = {kind: Histogram() for kind in KINDS}
+
+        histograms['delay'].record(delay * 1000)
+        histograms['handler'].record(handler * 1000)
+        histograms['rest'].record(rest * 1000)
+
+    def to_dict(self):
+        return {
+            command: {kind: hist.to_dict() for kind, hist in histograms.items()}
+            for command, histograms in self.commands.items()
+        }
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(self.to_dict(), fh, indent=2, sort_keys=True)
+        logger.info(f'Wrote command latencies to {path}')
+
+class Counters:
+    ''' Running totals since startup '''
+
+    __slots__ = (
+        'events',
+        'rest_requests',
+        'rest_errors',
+        'ratelimited',
+    )
+
+    def __init__(self):
+        self.events = Counter()
+        self.rest_requests = 0
+        self.rest_errors = Counter()
+        self.ratelimited = 0
+
+class RateLimitCounter(logging.Filter):
+    ''' Counts the 429s discord.py retries inside HTTPClient.request,
+    which it only reports by logging them.
+    '''
+
+    def __init__(self, counters):
+        super().__init__()
+        self.counters = counters
+
+    def filter(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith(RATELIMIT_MESSAGE):
+            self.counters.ratelimited += 1
+        return True
+
+class LoopLag:
+    ''' Measures how late the event loop wakes up from a sleep '''
+
+    __slots__ = (
+        'interval',
+        'last',
+        'max',
+        'task',
+    )
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.last = 0.0
+        self.max = 0.0
+        self.task = None
+
+    def start(self, loop):
+        if self.task is None:
+            self.task = loop.create_task(self._run(loop))
+
+    async def _run(self, loop):
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last = max(loop.time() - start - self.interval, 0.0)
+            self.max = max(self.max, self.last)
+
+class RollingWindow:
+    ''' The last few samples of something, in milliseconds '''
+
+    __slots__ = (
+        'samples',
+    )
+
+    def __init__(self, size=100):
+        self.samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, ms):
+        self.samples.append(ms)
+
+    @property
+    def last(self):
+        return self.samples[-1] if self.samples else 0.0
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+
+        ordered = sorted(self.samples)
+        return ordered[min(math.ceil(len(ordered) * pct / 100), len(ordered)) - 1]
+
+class PingTracker:
+    ''' Splits "ping" into its parts:
+    - gateway: heartbeat to heartbeat ack, sampled in the background
+    - rest: round trip of every message edit made through discord.py
+    - event: message creation (from its snowflake) to the gateway event arriving here
+
+    The event delay depends on the local clock, so it's corrected by the clock offset
+    estimated from the edit round trips, using the sample with the fastest round trip.
+    '''
+
+    __slots__ = (
+        'gateway',
+        'rest',
+        'event',
+        'arrivals',
+        'offsets',
+        'interval',
+        'task',
+    )
+
+    def __init__(self, interval=30, size=100):
+        self.gateway = RollingWindow(size)
+        self.rest = RollingWindow(size)
+        self.event = RollingWindow(size)
+        self.arrivals = OrderedDict()
+        self.offsets = deque(maxlen=size)
+        self.interval = interval
+        self.task = None
+
+    def start(self, bot):
+        if self.task is None:
+            self.task = bot.loop.create_task(self._run(bot))
+
+    async def _run(self, bot):
+        while True:
+            latency = bot.latency
+            if math.isfinite(latency):
+                self.gateway.add(latency * 1000)
+            await asyncio.sleep(self.interval)
+
+    @property
+    def offset(self):
+        ''' How far ahead of the local clock Discord's is, in seconds '''
+
+        if not self.offsets:
+            return 0.0
+        return min(self.offsets)[1]
+
+    def record_edit(self, sent, rtt, data):
+        self.rest.add(rtt * 1000)
+
+        edited = data.get('edited_timestamp') if isinstance(data, dict) else None
+        if edited:
+            server = discord.utils.parse_time(edited).replace(tzinfo=timezone.utc).timestamp()
+            self.offsets.append((rtt, server - (sent + rtt / 2)))
+
+    def event_delay(self, snowflake, received=None):
+        if received is None:
+            received = time.time()
+
+        created = ((snowflake >> 22) + discord.utils.DISCORD_EPOCH) / 1000
+        return (received + self.offset - created) * 1000
+
+    def record_event(self, snowflake):
+        delay = self.event_delay(snowflake)
+        self.event.add(delay)
+
+        self.arrivals[snowflake] = delay
+        if len(self.arrivals) > ARRIVALS_SIZE:
+            self.arrivals.popitem(last=False)
+
+    def arrival_delay(self, snowflake):
+        ''' Gets the event delay recorded when the message came in, if it's recent enough '''
+
+        return self.arrivals.get(snowflake)
+
+def instrument_http(http, counters, pings):
+    ''' Wraps the HTTP client's request() to count calls,
+    add its time to the running command's total,
+    and time message edits for the ping breakdown.
+    Also counts the 429s it retries, see RateLimitCounter.
+    '''
+
+    logging.getLogger('discord.http').addFilter(RateLimitCounter(counters))
+
+    request = http.request
+
+    async def timed_request(route, *args, **kwargs):
+        counters.rest_requests += 1
+        sent = time.time()
+        start = time.perf_counter()
+        try:
+            data = await request(route, *args, **kwargs)
+            if route.method == 'PATCH' and route.path == EDIT_PATH:
+                pings.record_edit(sent, time.perf_counter() - start, data)
+            return data
+        except Exception as error:
+            status = getattr(getattr(error, 'response', None), 'status', None)
+            counters.rest_errors[status or type(error).__name__] += 1
+            raise
+        finally:
+            total = REST_TIME.get()
+            if total is not None:
+                total[0] += time.perf_counter() - start
+
+    http.request = timed_request
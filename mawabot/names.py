@@ -0,0 +1,254 @@
+#
+# names.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+names.py
+Keeps indices of normalized names so lookups don't scan the cache
+'''
+
+import logging
+from collections import Counter
+
+from .utils import normalize_caseless
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'NameIndex',
+    'TrigramIndex',
+]
+
+KINDS = ('users', 'channels', 'guilds', 'roles')
+
+def trigrams(key):
+    ''' Gets the trigrams of a key, padded so prefixes share grams '''
+
+    padded = f'  {key} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+class TrigramIndex:
+    ''' Inverted index of trigram -> keys, for ranked fuzzy and prefix matching '''
+
+    __slots__ = (
+        'postings',
+        'sizes',
+    )
+
+    def __init__(self, keys=()):
+        self.postings = {}
+        self.sizes = {}
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        if key in self.sizes:
+            return
+
+        grams = trigrams(key)
+        self.sizes[key] = len(grams)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        if self.sizes.pop(key, None) is None:
+            return
+
+        for gram in trigrams(key):
+            keys = self.postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+
+    def search(self, query, cutoff=0.3):
+        ''' Gets keys similar to the query, best first. Prefix matches rank above the rest. '''
+
+        grams = trigrams(query)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.postings.get(gram, ()))
+
+        scored = []
+        for key, common in counts.items():
+            score = 2 * common / (len(grams) + self.sizes[key])
+            if key.startswith(query):
+                score += 1
+            if score >= cutoff:
+                scored.append((score, key))
+
+        scored.sort(reverse=True)
+        return [key for _, key in scored]
+
+class NameIndex:
+    ''' Maps normalize_caseless(name) -> IDs for each kind of entity '''
+
+    __slots__ = (
+        'bot',
+        'names',
+        'keys',
+        'roles',
+        'trigrams',
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.names = {kind: {} for kind in KINDS}
+        self.keys = {kind: {} for kind in KINDS}
+        self.roles = {}
+        self.trigrams = {}
+
+    def clear(self):
+        for kind in KINDS:
+            self.names[kind].clear()
+            self.keys[kind].clear()
+        self.roles.clear()
+        self.trigrams.clear()
+
+    def fill(self):
+        ''' Rebuilds every index from the bot's cache '''
+
+        self.clear()
+        for guild in self.bot.guilds:
+            self.add_guild(guild)
+        for user in self.bot.users:
+            self.add('users', user)
+
+        counts = ', '.join(f'{len(self.keys[kind])} {kind}' for kind in KINDS)
+        logger.info(f'Indexed names: {counts}')
+
+    # Low-level updates
+    def add(self, kind, obj):
+        ''' Adds or renames the given object in the index '''
+
+        key = normalize_caseless(obj.name)
+        old = self.keys[kind].get(obj.id)
+        if old == key:
+            return
+
+        if old is not None:
+            self._discard(kind, old, obj.id)
+
+        ids = self.names[kind].get(key)
+        if ids is None:
+            ids = self.names[kind][key] = set()
+            if kind in self.trigrams:
+                self.trigrams[kind].add(key)
+
+        ids.add(obj.id)
+        self.keys[kind][obj.id] = key
+
+    def remove(self, kind, obj):
+        key = self.keys[kind].pop(obj.id, None)
+        if key is not None:
+            self._discard(kind, key, obj.id)
+
+    def _discard(self, kind, key, id):
+        ids = self.names[kind].get(key)
+        if ids is None:
+            return
+
+        ids.discard(id)
+        if not ids:
+            del self.names[kind][key]
+            if kind in self.trigrams:
+                self.trigrams[kind].remove(key)
+
+    def ids(self, kind, name):
+        ''' Gets the IDs of all objects of this kind with the given name '''
+
+        return self.names[kind].get(normalize_caseless(name), ())
+
+    # Entity helpers
+    def add_guild(self, guild):
+        self.add('guilds', guild)
+        for channel in guild.channels:
+            self.add('channels', channel)
+        for role in guild.roles:
+            self.add_role(role)
+        for member in guild.members:
+            self.add('users', member)
+
+    def remove_guild(self, guild):
+        self.remove('guilds', guild)
+        for channel in guild.channels:
+            self.remove('channels', channel)
+        for role in guild.roles:
+            self.remove_role(role)
+
+    def add_role(self, role):
+        self.roles[role.id] = role
+        self.add('roles', role)
+
+    def remove_role(self, role):
+        self.roles.pop(role.id, None)
+        self.remove('roles', role)
+
+    # Lookups
+    @staticmethod
+    def _first(objects):
+        ''' Picks the oldest object, so results are stable between calls '''
+
+        objects = [obj for obj in objects if obj is not None]
+        return min(objects, key=lambda obj: obj.id) if objects else None
+
+    def find_user(self, name):
+        return self._first(map(self.bot.get_user, self.ids('users', name)))
+
+    def find_channel(self, name, guild=None):
+        channels = map(self.bot.get_channel, self.ids('channels', name))
+        if guild is not None:
+            channels = (chan for chan in channels if getattr(chan, 'guild', None) == guild)
+        return self._first(channels)
+
+    def find_guild(self, name):
+        return self._first(map(self.bot.get_guild, self.ids('guilds', name)))
+
+    def find_role(self, name, guild):
+        roles = map(self.roles.get, self.ids('roles', name))
+        return self._first(role for role in roles if role is not None and role.guild == guild)
+
+    def get_role(self, id, guild=None):
+        role = self.roles.get(id)
+        if role is None or (guild is not None and role.guild != guild):
+            return None
+        return role
+
+    # Fuzzy lookups
+    def _search(self, kind, name, get, where=None, limit=5):
+        # Built on first use, then kept up to date by add() and remove()
+        index = self.trigrams.get(kind)
+        if index is None:
+            logger.debug(f'Building trigram index for {kind}')
+            index = self.trigrams[kind] = TrigramIndex(self.names[kind])
+
+        found = []
+        for key in index.search(normalize_caseless(name)):
+            for obj in map(get, sorted(self.names[kind][key])):
+                if obj is None or (where is not None and not where(obj)):
+                    continue
+
+                found.append(obj)
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def search_users(self, name, limit=5):
+        return self._search('users', name, self.bot.get_user, limit=limit)
+
+    def search_channels(self, name, guild=None, limit=5):
+        where = None if guild is None else (lambda chan: getattr(chan, 'guild', None) == guild)
+        return self._search('channels', name, self.bot.get_channel, where, limit)
+
+    def search_guilds(self, name, limit=5):
+        return self._search('guilds', name, self.bot.get_guild, limit=limit)
+
+    def search_roles(self, name, guild, limit=5):
+        return self._search('roles', name, self.roles.get, lambda role: role.guild == guild, limit)
@@ -0,0 +1,184 @@
+#
+# outbound.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+outbound.py
+Queues messages for the output channel and packs them into as few sends as possible
+'''
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from .metrics import REST_TIME
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'OutputQueue',
+]
+
+MAX_CONTENT = 2000
+
+# How much of an error to quote when a send fails
+MAX_ERROR = 1000
+
+class OutputItem:
+    __slots__ = (
+        'content',
+        'embed',
+        'kwargs',
+        'rest_time',
+    )
+
+    def __init__(self, content, embed, kwargs):
+        self.content = content
+        self.embed = embed.to_dict() if embed is not None else None
+        self.kwargs = kwargs
+
+        # The REST time total of the command that queued it, if any
+        self.rest_time = REST_TIME.get()
+
+class OutputQueue:
+    ''' Sends queued output with as few messages as possible,
+    paced by discord.py's lock on the channel's message route.
+    The API version discord.py uses only takes one embed per message,
+    so text is merged into runs that end with at most one embed.
+    '''
+
+    __slots__ = (
+        'bot',
+        'pending',
+        'ready',
+        'task',
+        'items_sent',
+        'items_failed',
+        'messages_sent',
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.task = None
+        self.items_sent = 0
+        self.items_failed = 0
+        self.messages_sent = 0
+
+    @property
+    def depth(self):
+        return len(self.pending)
+
+    def put(self, content=None, *, embed=None, **kwargs):
+        ''' Queues a message for the output channel. Returns without waiting for it to send. '''
+
+        if content is not None:
+            content = str(content)
+
+        if kwargs and embed is not None:
+            # Sent on its own, so the embed goes along with the other options
+            kwargs['embed'] = embed
+            embed = None
+
+        self.pending.append(OutputItem(content, embed, kwargs))
+        self.ready.set()
+
+        if self.task is None or self.task.done():
+            self.task = self.bot.loop.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _take_batch(self):
+        ''' Pops as many items as fit into one message '''
+
+        first = self.pending.popleft()
+        if first.kwargs:
+            # Files and other options can't be merged
+            return [first]
+
+        batch = [first]
+        content = len(first.content or '')
+
+        # Discord shows the content above the embed, so the embed has to come last
+        while self.pending and batch[-1].embed is None:
+            item = self.pending[0]
+            if item.kwargs:
+                break
+
+            new_content = content + (len(item.content) + 1 if item.content else 0)
+            if new_content > MAX_CONTENT:
+                break
+
+            batch.append(self.pending.popleft())
+            content = new_content
+        return batch
+
+    async def _send(self, batch):
+        channel = self.bot.output_chan
+        if len(batch) == 1 and batch[0].kwargs:
+            item = batch[0]
+            await channel.send(content=item.content, **item.kwargs)
+            return
+
+        payload = {}
+        content = '\n'.join(item.content for item in batch if item.content)
+        if content:
+            payload['content'] = content
+        if batch[-1].embed is not None:
+            payload['embed'] = batch[-1].embed
+
+        await self.bot.rest.request('POST', '/channels/{channel_id}/messages',
+                                    channel_id=channel.id, json=payload)
+
+    async def _report(self, batch, error):
+        ''' Says in the output channel that something queued for it was lost '''
+
+        try:
+            await self.bot.output_chan.send(
+                content=f'Could not send {len(batch)} queued output item(s): `{str(error)[:MAX_ERROR]}`')
+        except discord.HTTPException as report_error:
+            logger.error('Could not report the failed send either', exc_info=report_error)
+
+    async def _run(self):
+        # The task was started from whichever command queued first, so sends are
+        # charged to the commands in each batch instead of to that one
+        REST_TIME.set(None)
+
+        while True:
+            await self.ready.wait()
+            if not self.pending:
+                self.ready.clear()
+                continue
+
+            batch = self._take_batch()
+            start = time.perf_counter()
+            try:
+                await self._send(batch)
+            except Exception as error:
+                logger.error(f'Failed to send {len(batch)} queued output item(s)', exc_info=error)
+                self.items_failed += len(batch)
+                await self._report(batch, error)
+            else:
+                self.items_sent += len(batch)
+                self.messages_sent += 1
+                logger.debug(f'Sent {len(batch)} output item(s), {self.depth} still queued')
+            finally:
+                elapsed = time.perf_counter() - start
+                totals = {id(item.rest_time): item.rest_time for item in batch if item.rest_time is not None}
+                for total in totals.values():
+                    total[0] += elapsed
@@ -0,0 +1,227 @@
+#
+# profiling.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+profiling.py
+Records where the time goes while the bot starts up
+'''
+
+import logging
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'StartupProfiler',
+]
+
+ImportRecord = namedtuple('ImportRecord', ('name', 'depth', 'self_time', 'total_time', 'cog'))
+
+class TimedLoader:
+    ''' Wraps a module loader, timing exec_module() and passing everything else through '''
+
+    __slots__ = (
+        'loader',
+        'profiler',
+        'name',
+    )
+
+    def __init__(self, loader, profiler, name):
+        self.loader = loader
+        self.profiler = profiler
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profiler.import_started(self.name)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler.import_finished()
+
+class ImportTimer:
+    ''' Meta path finder that hands back specs with timed loaders, like -X importtime '''
+
+    __slots__ = (
+        'profiler',
+    )
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if hasattr(spec.loader, 'exec_module'):
+            spec.loader = TimedLoader(spec.loader, self.profiler, fullname)
+        return spec
+
+class StartupProfiler:
+    ''' Collects startup phase timings and a per-cog import tree.
+    When disabled every method is a no-op, so callers don't need to check.
+    '''
+
+    __slots__ = (
+        'enabled',
+        'path',
+        'start',
+        'finder',
+        'phases',
+        'marks',
+        'imports',
+        'stack',
+        'cog',
+    )
+
+    def __init__(self, path=None, enabled=True):
+        self.enabled = enabled
+        self.path = path
+        self.start = time.perf_counter()
+        self.finder = None
+        self.phases = OrderedDict()
+        self.marks = OrderedDict()
+        self.imports = []
+        self.stack = []
+        self.cog = None
+
+    def install(self):
+        ''' Starts timing imports '''
+
+        if self.enabled and self.finder is None:
+            self.finder = ImportTimer(self)
+            sys.meta_path.insert(0, self.finder)
+
+    def uninstall(self):
+        if self.finder is not None:
+            sys.meta_path.remove(self.finder)
+            self.finder = None
+
+    # Import tracking
+    def import_started(self, name):
+        # [name, start, time spent in child imports]
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def import_finished(self):
+        name, start, children = self.stack.pop()
+        total = time.perf_counter() - start
+        if self.stack:
+            self.stack[-1][2] += total
+
+        self.imports.append(ImportRecord(name, len(self.stack), total - children, total, self.cog or 'startup'))
+
+    # Phases
+    def mark(self, name):
+        ''' Records that the given point in startup was reached '''
+
+        if self.enabled and name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+
+    @contextmanager
+    def phase(self, name, cog=None):
+        ''' Times the enclosed block, attributing its imports to the given cog '''
+
+        if not self.enabled:
+            yield
+            return
+
+        old_cog = self.cog
+        self.cog = cog or old_cog
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+            self.cog = old_cog
+
+    # Reporting
+    def cog_totals(self):
+        totals = OrderedDict()
+        for record in self.imports:
+            if record.depth == 0:
+                totals[record.cog] = totals.get(record.cog, 0.0) + record.total_time
+        return totals
+
+    def summary(self, slowest=15):
+        ''' Gets the short form of the report, without the import tree '''
+
+        lines = ['Milestones (since start):']
+        lines.extend(f'  {secs * 1000:10.1f} ms  {name}' for name, secs in self.marks.items())
+        lines.append('')
+        lines.append('Phases:')
+        lines.extend(f'  {secs * 1000:10.1f} ms  {name}' for name, secs in self.phases.items())
+        lines.append('')
+        lines.append('Import time by cog:')
+        lines.extend(f'  {secs * 1000:10.1f} ms  {cog}' for cog, secs in self.cog_totals().items())
+        lines.append('')
+        lines.append('Slowest imports (self time):')
+        records = sorted(self.imports, key=lambda record: record.self_time, reverse=True)[:slowest]
+        lines.extend(f'  {rec.self_time * 1000:10.1f} ms  {rec.name} ({rec.cog})' for rec in records)
+        return '\n'.join(lines)
+
+    def report(self):
+        ''' Gets the full report, including the import tree '''
+
+        lines = [self.summary(), '', 'Import tree:', '      self [us] |  cumulative | imported package']
+        for record in self.imports:
+            indent = '  ' * record.depth
+            lines.append(f'  {record.self_time * 1e6:12.0f} | {record.total_time * 1e6:11.0f} | '
+                         f'{indent}{record.name} ({record.cog})')
+        return '\n'.join(lines)
+
+    def finish(self, deferred=False):
+        ''' Called once the bot is ready. Writes the report, and stops timing imports
+        unless there are deferred cogs whose imports still have to be recorded.
+        '''
+
+        if not self.enabled or 'startup complete' in self.marks:
+            return
+
+        self.mark('startup complete')
+        if not deferred:
+            self.uninstall()
+        self.write()
+
+    def deferred_loaded(self, name, remaining):
+        ''' Called when a deferred cog is loaded, rewriting the report to include it '''
+
+        if not self.enabled:
+            return
+
+        self.mark(f'deferred load {name}')
+        if not remaining:
+            self.uninstall()
+        self.write()
+
+    def write(self):
+        if not self.enabled or self.path is None:
+            return
+
+        with open(self.path, 'w', encoding='utf-8') as fh:
+            fh.write(self.report())
+            fh.write('\n')
+        logger.info(f'Wrote startup profile to {self.path}')
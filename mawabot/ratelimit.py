@@ -0,0 +1,53 @@
+#
+# ratelimit.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+ratelimit.py
+Sends REST requests paced by Discord's rate limit headers
+'''
+
+import logging
+
+from discord.http import Route
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'RouteScheduler',
+]
+
+class RouteScheduler:
+    ''' Makes REST requests for routes discord.py has no method for.
+    They go through the bot's HTTPClient, so they share its auth, its retries
+    and its per-route locks, which hold a route until its rate limit bucket resets.
+    '''
+
+    __slots__ = (
+        'bot',
+        'requests',
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.requests = 0
+
+    async def request(self, method, path, *, json=None, **params):
+        ''' Makes a request to the given route, waiting out any rate limits first.
+        Returns the decoded response, or raises discord.HTTPException on failure.
+        '''
+
+        route = Route(method, path, **params)
+        self.requests += 1
+        logger.debug(f'{method} {route.url}')
+        if json is None:
+            return await self.bot.http.request(route)
+        return await self.bot.http.request(route, json=json)
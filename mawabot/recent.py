@@ -0,0 +1,106 @@
+#
+# recent.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+recent.py
+Remembers my own recent messages in each channel, so finding them doesn't need history
+'''
+
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'RecentMessages',
+]
+
+# How many messages to keep per channel, and how many channels to keep
+PER_CHANNEL = 100
+MAX_CHANNELS = 500
+
+# How far back to look through history when the buffer doesn't have enough
+HISTORY_LIMIT = 100
+
+class RecentMessages:
+    ''' A ring buffer of my own messages for each channel, newest last.
+    The stored messages are the same objects discord.py keeps in its cache,
+    so edits show up in them too.
+    '''
+
+    __slots__ = (
+        'bot',
+        'channels',
+        'hits',
+        'misses',
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.channels = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, message):
+        channel_id = message.channel.id
+        ring = self.channels.get(channel_id)
+        if ring is None:
+            ring = self.channels[channel_id] = deque(maxlen=PER_CHANNEL)
+            if len(self.channels) > MAX_CHANNELS:
+                self.channels.popitem(last=False)
+        else:
+            self.channels.move_to_end(channel_id)
+
+        ring.append(message)
+
+    def remove(self, channel_id, *message_ids):
+        ring = self.channels.get(channel_id)
+        if ring is None:
+            return
+
+        message_ids = set(message_ids)
+        if any(message.id in message_ids for message in ring):
+            kept = [message for message in ring if message.id not in message_ids]
+            ring.clear()
+            ring.extend(kept)
+
+    def cached(self, channel_id, count):
+        ''' Gets up to count of my latest messages in the channel, newest first, without any requests '''
+
+        ring = self.channels.get(channel_id, ())
+        messages = []
+        for message in reversed(ring):
+            messages.append(message)
+            if len(messages) >= count:
+                break
+        return messages
+
+    async def latest(self, channel, count):
+        ''' Gets up to count of my latest messages in the channel, newest first.
+        Only goes to the channel's history for whatever the buffer doesn't have.
+        '''
+
+        messages = self.cached(channel.id, count)
+        if len(messages) >= count:
+            self.hits += 1
+            return messages
+
+        self.misses += 1
+        logger.debug(f'Only {len(messages)} of {count} recent messages cached, checking history')
+
+        before = messages[-1] if messages else None
+        async for message in channel.history(limit=HISTORY_LIMIT, before=before):
+            if message.author.id == self.bot.user.id:
+                messages.append(message)
+                if len(messages) >= count:
+                    break
+        return messages
@@ -0,0 +1,125 @@
+#
+# router.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+router.py
+Sends my messages to the cog handlers whose triggers they match
+'''
+
+import logging
+import re
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'MessageRouter',
+]
+
+# How many message IDs to remember, to skip duplicate events
+SEEN_SIZE = 1000
+
+class MessageRouter:
+    ''' Trigger table for messages, so cogs don't each need their own on_message.
+    Exact triggers are a dict lookup. Regex triggers are combined into one
+    alternation, compiled when the table changes, so each message is matched once
+    no matter how many triggers there are. Because of that, only the first regex
+    trigger that matches fires, after every exact trigger for the content.
+    '''
+
+    __slots__ = (
+        'exact',
+        'patterns',
+        'combined',
+        'seen',
+    )
+
+    def __init__(self):
+        self.exact = {}
+        self.patterns = []
+        self.combined = None
+        self.seen = OrderedDict()
+
+    def add_trigger(self, trigger, handler, regex=False):
+        ''' Calls handler(message) for my messages matching trigger.
+        Without regex the whole content has to equal it. Regex triggers can't
+        have capturing groups or backreferences, since they're numbered across
+        the combined pattern; use (?:...) instead.
+        '''
+
+        if regex:
+            if re.compile(trigger).groups:
+                raise ValueError(f'Trigger pattern {trigger!r} has capturing groups, use (?:...) instead')
+            self.patterns.append((trigger, handler))
+            try:
+                self._compile()
+            except re.error as error:
+                # Like global flags such as (?i), which only work at the very start
+                self.patterns.pop()
+                self._compile()
+                raise ValueError(f"Trigger pattern {trigger!r} can't be combined: {error}") from error
+        else:
+            self.exact.setdefault(trigger, []).append(handler)
+        logger.debug(f'Added trigger {trigger!r} for {handler.__qualname__}')
+
+    def remove_owner(self, owner):
+        ''' Drops every trigger whose handler is a method of owner, for when a cog is removed '''
+
+        def keep(handler):
+            return getattr(handler, '__self__', None) is not owner
+
+        for trigger, handlers in list(self.exact.items()):
+            handlers = [handler for handler in handlers if keep(handler)]
+            if handlers:
+                self.exact[trigger] = handlers
+            else:
+                del self.exact[trigger]
+
+        self.patterns = [(pattern, handler) for pattern, handler in self.patterns if keep(handler)]
+        self._compile()
+
+    def _compile(self):
+        if not self.patterns:
+            self.combined = None
+            return
+
+        # Each pattern gets its own group, so the match says which one it was
+        parts = (f'(?P<t{i}>{pattern})' for i, (pattern, _) in enumerate(self.patterns))
+        self.combined = re.compile('|'.join(parts))
+
+    def first_seen(self, id):
+        ''' Checks whether this is the first time the message ID came through '''
+
+        if id in self.seen:
+            return False
+
+        self.seen[id] = None
+        if len(self.seen) > SEEN_SIZE:
+            self.seen.popitem(last=False)
+        return True
+
+    def handlers(self, content):
+        ''' Gets the handlers whose triggers match the content '''
+
+        handlers = list(self.exact.get(content, ()))
+        if self.combined is not None:
+            match = self.combined.search(content)
+            if match is not None:
+                handlers.append(self.patterns[int(match.lastgroup[1:])][1])
+        return handlers
+
+    async def dispatch(self, message):
+        for handler in self.handlers(message.content):
+            try:
+                await handler(message)
+            except Exception as error:
+                logger.error(f'Trigger handler {handler.__qualname__} failed', exc_info=error)
@@ -10,7 +10,10 @@
 # WITHOUT ANY WARRANTY. See the LICENSE file for more details.
 #
 
+import asyncio
 import logging
+import math
+import sys
 import unicodedata
 
 import discord
@@ -23,26 +26,93 @@ COGS_DIR = 'mawabot.cogs.'
 __all__ = [
     'Reloader',
     'Wrapper',
+    'did_you_mean',
     'normalize_caseless',
 ]
 
 class Reloader:
     __slots__ = (
         'bot',
+        'watch_task',
     )
 
     def __init__(self, bot):
         self.bot = bot
+        self.watch_task = None
 
-    def load_cog(self, cogname):
+        interval = bot.config.get('reload-watch')
+        if interval:
+            self.start_watch(interval)
+
+    @staticmethod
+    def _full_name(cogname):
         if COGS_DIR not in cogname:
             cogname = f'{COGS_DIR}{cogname}'
-        self.bot.load_extension(cogname)
+        return cogname
+
+    def load_cog(self, cogname):
+        self.bot.load_extension(self._full_name(cogname))
 
     def unload_cog(self, cogname):
-        if COGS_DIR not in cogname:
-            cogname = f'{COGS_DIR}{cogname}'
-        self.bot.unload_extension(cogname)
+        self.bot.unload_extension(self._full_name(cogname))
+
+    def reload_cog(self, cogname):
+        ''' Reloads the extension, re-importing only the submodules that changed on disk
+        (and the ones that import them). Returns the names of the re-imported submodules.
+        '''
+
+        cogname = self._full_name(cogname)
+        modules = self.bot.modules
+        order = modules.reload_order(cogname, modules.stale(cogname))
+        logger.debug(f'Modules to reload for {cogname}: {order}')
+
+        # The package itself is always re-imported by load_extension()
+        removed = {name: sys.modules.pop(name) for name in order if name != cogname and name in sys.modules}
+        try:
+            self.bot.unload_extension(cogname)
+            self.bot.load_extension(cogname)
+        except:
+            # Bring back the old versions so the cog keeps working
+            logger.info(f'Restoring previous modules for {cogname}')
+            sys.modules.update(removed)
+            try:
+                self.bot.load_extension(cogname)
+            except Exception as error:
+                logger.error(f'Could not restore {cogname}', exc_info=error)
+            raise
+
+        return [name for name in order if name != cogname]
+
+    def start_watch(self, interval):
+        self.stop_watch()
+        logger.info(f'Watching cogs for changes every {interval} seconds')
+        self.watch_task = self.bot.loop.create_task(self._watch(interval))
+
+    def stop_watch(self):
+        if self.watch_task is not None:
+            self.watch_task.cancel()
+            self.watch_task = None
+
+    async def _watch(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+
+            for extension in list(self.bot.extensions):
+                if not self.bot.modules.stale(extension):
+                    continue
+
+                logger.info(f'Change detected in {extension}, reloading...')
+                try:
+                    modules = self.reload_cog(extension)
+                except Exception as error:
+                    logger.error(f'Automatic reload of {extension} failed', exc_info=error)
+                    # Don't retry until the files change again
+                    self.bot.modules.snapshot(extension)
+                    await self.bot.output_send(content=f'Automatic reload of `{extension}` failed: `{error}`')
+                else:
+                    logger.info(f'Reloaded cog: {extension}')
+                    modules = ', '.join(modules) or 'package only'
+                    await self.bot.output_send(content=f'Reloaded `{extension}` ({modules})')
 
     @commands.command()
     async def load(self, ctx, cogname: str):
@@ -94,8 +164,7 @@ class Reloader:
 
         # Load cog
         try:
-            self.unload_cog(cogname)
-            self.load_cog(cogname)
+            modules = self.reload_cog(cogname)
         except Exception as error:
             logger.error('Reload failed')
             logger.debug('Reason:', exc_info=error)
@@ -104,10 +173,34 @@ class Reloader:
             await ctx.send(embed=embed)
         else:
             logger.info(f'Reloaded cog: {cogname}')
-            embed = discord.Embed(color=discord.Color.green(), description=f'```{cogname}```')
+            desc = '\n'.join([cogname] + [f' - {name}' for name in modules])
+            embed = discord.Embed(color=discord.Color.green(), description=f'```{desc}```')
             embed.set_author(name='Reloaded')
             await ctx.send(embed=embed)
 
+    @commands.command()
+    async def watch(self, ctx, interval: str = 'off'):
+        ''' Reloads cogs automatically when their files change. Give an interval in seconds, or "off" '''
+
+        if interval == 'off':
+            self.stop_watch()
+            await ctx.message.edit(content='Stopped watching cogs for changes')
+            return
+
+        try:
+            seconds = float(interval)
+        except ValueError:
+            seconds = math.nan
+
+        if not (math.isfinite(seconds) and seconds > 0):
+            await ctx.message.edit(content='Usage: `watch <seconds>` (more than 0) or `watch off`')
+            return
+
+        self.start_watch(seconds)
+        content = f'Watching cogs for changes every {seconds:g} seconds'
+
+        await ctx.message.edit(content=content)
+
     @commands.command()
     async def cogs(self, ctx):
         '''
@@ -121,6 +214,11 @@ class Reloader:
         else:
             lines.append(' - None')
 
+        pending = sorted(set(self.bot.lazy_commands.values()))
+        if pending:
+            lines.append('Cogs Deferred:')
+            lines.extend(f' - {cog[len(COGS_DIR):]}' for cog in pending)
+
         lines.append('```')
 
         await ctx.message.edit(content='\n'.join(lines))
@@ -148,3 +246,9 @@ def paginate(text, page_size=5):
 
 def normalize_caseless(s):
     return unicodedata.normalize('NFKD', s.casefold())
+
+def did_you_mean(objects):
+    ''' Formats a list of suggested objects, or an empty string if there are none '''
+    if not objects:
+        return ''
+    return 'Did you mean ' + ', '.join(f'`{obj.name}`' for obj in objects) + '?'
@@ -0,0 +1,143 @@
+#
+# watchdog.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+watchdog.py
+Catches whatever is blocking the event loop while it's still blocking it
+'''
+
+import logging
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'Watchdog',
+]
+
+# How often the loop checks in, and how often the thread looks
+BEAT_INTERVAL = 0.1
+
+# Don't post more than one report per this many seconds
+REPORT_COOLDOWN = 30
+
+STACK_LIMIT = 12
+
+def _find_command(frame):
+    ''' Walks up the stack looking for a command's "ctx" argument '''
+
+    while frame is not None:
+        ctx = frame.f_locals.get('ctx')
+        command = getattr(ctx, 'command', None)
+        if command is not None:
+            return command.qualified_name
+        frame = frame.f_back
+    return None
+
+class Watchdog:
+    ''' The event loop bumps a heartbeat every BEAT_INTERVAL seconds.
+    A separate thread checks it, and if the loop is stuck for longer than
+    the threshold, grabs the loop thread's stack right then.
+    The report goes out once the loop is free again.
+    '''
+
+    __slots__ = (
+        'bot',
+        'threshold',
+        'beat',
+        'loop_thread',
+        'thread',
+        'stopped',
+        'stall',
+        'last_report',
+        'stalls',
+    )
+
+    def __init__(self, bot, threshold=0.5):
+        self.bot = bot
+        self.threshold = threshold
+        self.beat = time.monotonic()
+        self.loop_thread = None
+        self.thread = None
+        self.stopped = threading.Event()
+        self.stall = None
+        self.last_report = 0.0
+        self.stalls = 0
+
+    def start(self):
+        if self.thread is not None:
+            return
+
+        self.loop_thread = threading.get_ident()
+        self.bot.loop.call_soon(self._heartbeat)
+        self.thread = threading.Thread(target=self._watch, name='mawabot-watchdog', daemon=True)
+        self.thread.start()
+        logger.info(f'Watchdog started, threshold {self.threshold}s')
+
+    def stop(self):
+        self.stopped.set()
+
+    # Event loop side
+    def _heartbeat(self):
+        now = time.monotonic()
+        stall, self.stall = self.stall, None
+        if stall is not None:
+            self._report(now - self.beat, *stall)
+
+        self.beat = now
+        if not self.stopped.is_set():
+            self.bot.loop.call_later(BEAT_INTERVAL, self._heartbeat)
+
+    def _report(self, duration, command, stack):
+        self.stalls += 1
+        where = f' in command `{command}`' if command else ''
+        logger.warning(f'Event loop blocked for {duration:.2f}s{where}:\n{stack}')
+
+        now = time.monotonic()
+        if now - self.last_report < REPORT_COOLDOWN:
+            return
+        self.last_report = now
+
+        # For embed.color
+        # pylint: disable=assigning-non-slot
+
+        # Keep the end of the stack, that's where it's stuck
+        stack = stack[-1000:].replace('```', "'''")
+        embed = discord.Embed(type='rich', description=f'```py\n{stack}\n```')
+        embed.set_author(name=f'Event loop blocked for {duration:.2f}s{where}')
+        embed.color = discord.Color.orange()
+        embed.timestamp = datetime.utcnow()
+        self.bot.loop.create_task(self.bot.output_send(embed=embed))
+
+    # Watchdog thread side
+    def _watch(self):
+        while not self.stopped.wait(BEAT_INTERVAL):
+            if self.stall is not None:
+                continue
+
+            blocked = time.monotonic() - self.beat
+            if blocked < self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is None:
+                continue
+
+            stack = ''.join(traceback.format_stack(frame, limit=STACK_LIMIT))
+            self.stall = (_find_command(frame), stack)
+            logger.debug(f'Event loop blocked for over {blocked:.2f}s, stack captured')
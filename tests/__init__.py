@@ -0,0 +1,16 @@
+#
+# tests/__init__.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+'''
+Behaviour checks for the parts of the bot that don't need a Discord connection.
+Run with "python -m unittest discover tests" from the repository root.
+'''
@@ -0,0 +1,82 @@
+#
+# tests/test_cowsay.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from mawabot.cogs.text.cowsay import DEFAULT_COW, CowError, balloon, cowsay, load_cow, parse_cowfile
+
+COWFILE = r'''
+##
+## A cow with its own eyes, and Perl escapes
+##
+$eyes = "\@\@";
+$extra = 'x';
+$the_cow = <<"EOC";
+  $thoughts  ($eyes) \$5 $extra
+   $thoughts  \\_/
+EOC
+'''
+
+class TestParseCowfile(unittest.TestCase):
+    def test_variables_and_escapes(self):
+        template, variables = parse_cowfile(COWFILE)
+        self.assertEqual(variables, {'eyes': '@@', 'extra': 'x'})
+
+        values = dict(variables, thoughts='\\')
+        self.assertEqual(template.safe_substitute(values), '  \\  (@@) $5 x\n   \\  \\_/\n')
+
+    def test_single_quoted_heredoc(self):
+        template, _ = parse_cowfile("$the_cow = <<'EOC';\n$eyes \\n\nEOC\n")
+        self.assertEqual(template.safe_substitute(eyes='oo'), '$eyes \\n\n')
+
+    def test_no_cow(self):
+        with self.assertRaises(CowError):
+            parse_cowfile('$eyes = "oo";\n')
+
+    def test_default(self):
+        template, variables = parse_cowfile(DEFAULT_COW)
+        self.assertEqual(variables, {})
+        self.assertIn('(oo)\\_______', template.safe_substitute(thoughts='\\', eyes='oo', tongue='  '))
+
+class TestBalloon(unittest.TestCase):
+    def test_one_line(self):
+        self.assertEqual(balloon('moo'), ' _____\n< moo >\n -----')
+
+    def test_many_lines(self):
+        lines = balloon('a\nbb\nc').splitlines()
+        self.assertEqual(lines[1:4], ['/ a  \\', '| bb |', '\\ c  /'])
+
+    def test_think_and_wrap(self):
+        lines = balloon('word ' * 20, think=True, width=20).splitlines()
+        self.assertTrue(all(line.startswith('(') for line in lines[1:-1]))
+        self.assertTrue(all(len(line) <= 24 for line in lines))
+
+class TestCowsay(unittest.TestCase):
+    def test_cowpath(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'test-moose.cow'), 'w', encoding='utf-8') as fh:
+                fh.write(COWFILE)
+
+            with mock.patch.dict(os.environ, {'COWPATH': directory}):
+                text = cowsay('hi', cow='test-moose', think=True)
+
+        self.assertEqual(text.splitlines()[1], '( hi )')
+        self.assertIn('o  (@@) $5 x', text)
+
+    def test_bad_names(self):
+        for name in ('../etc/passwd', 'no-such-cow-here'):
+            with self.subTest(name=name):
+                with self.assertRaises(CowError):
+                    load_cow(name)
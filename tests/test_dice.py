@@ -0,0 +1,112 @@
+#
+# tests/test_dice.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+import unittest
+
+import numpy as np
+
+from mawabot.cogs.general.dice import (
+    MAX_TERMS, DiceError, dice_distribution, dice_stats, format_dice, parse_dice, roll_dice,
+)
+
+def _mean(expr):
+    offset, probs = dice_distribution(format_dice(parse_dice(expr)))
+    return float(np.dot(np.arange(offset, offset + len(probs)), probs))
+
+class TestParse(unittest.TestCase):
+    def test_canonical(self):
+        cases = {
+            '20': '1d20',
+            'd%': '1d100',
+            '4d6kh3 + 2d8! - 1': '4d6kh3 + 2d8! - 1',
+            '4d6k3': '4d6kh3',
+            '4d6dl1': '4d6kh3',
+            '4d6dh1': '4d6kl3',
+            '- 2d4': '- 2d4',
+        }
+        for expr, canonical in cases.items():
+            with self.subTest(expr=expr):
+                self.assertEqual(format_dice(parse_dice(expr)), canonical)
+
+    def test_spaces(self):
+        self.assertEqual(format_dice(parse_dice('3 d 6')), '3d6')
+        self.assertEqual(format_dice(parse_dice('4 d 6 k 3 + 2 d 8 !')), '4d6kh3 + 2d8!')
+
+    def test_errors(self):
+        for expr in ('', '3d', '2d6 3', '0d6', '1d0', '1d1!', '2d6kh3', 'cheese',
+                     ' + '.join(['1'] * (MAX_TERMS + 1))):
+            with self.subTest(expr=expr):
+                with self.assertRaises(DiceError):
+                    parse_dice(expr)
+
+class TestRoll(unittest.TestCase):
+    def test_in_range(self):
+        for _ in range(100):
+            total, _ = roll_dice(parse_dice('3d6 + 1'))
+            self.assertTrue(4 <= total <= 19)
+
+    def test_keep(self):
+        for _ in range(100):
+            total, detail = roll_dice(parse_dice('4d6kh3'))
+            self.assertTrue(3 <= total <= 18)
+            self.assertEqual(detail.count('~~'), 2)
+
+    def test_big_pool(self):
+        # Rolled by sampling, so only the bounds and rough size can be checked
+        total, _ = roll_dice(parse_dice('1000000d1000000'))
+        self.assertTrue(1000000 <= total <= 10 ** 12)
+        self.assertAlmostEqual(total / (1000000 * 500000.5), 1, places=2)
+
+        total, detail = roll_dice(parse_dice('1000d6kl10'))
+        self.assertEqual(total, 10)
+        self.assertIn('kept 10 of 1,000', detail)
+
+class TestDistribution(unittest.TestCase):
+    def test_two_dice(self):
+        offset, probs = dice_distribution('2d6')
+        self.assertEqual(offset, 2)
+        expected = np.array([1, 2, 3, 4, 5, 6, 5, 4, 3, 2, 1]) / 36
+        np.testing.assert_allclose(probs, expected)
+
+    def test_constants_and_subtraction(self):
+        offset, probs = dice_distribution('1d4 - 1d4 + 3')
+        self.assertEqual(offset, 0)
+        self.assertEqual(len(probs), 7)
+        np.testing.assert_allclose(probs, probs[::-1])
+
+    def test_keep_highest(self):
+        # The well-known 4d6 drop lowest average
+        self.assertAlmostEqual(_mean('4d6kh3'), 15869 / 1296)
+        self.assertAlmostEqual(_mean('2d20kh1'), 13.825)
+        self.assertAlmostEqual(_mean('2d20kl1'), 7.175)
+
+    def test_explode(self):
+        self.assertAlmostEqual(_mean('1d6!'), 4.2, places=6)
+
+    def test_long_fft(self):
+        # Long enough to go through the FFT, which mustn't leave negative chances
+        offset, probs = dice_distribution('100d100')
+        self.assertEqual(offset, 100)
+        self.assertGreaterEqual(probs.min(), 0)
+        self.assertAlmostEqual(probs.sum(), 1)
+        self.assertAlmostEqual(_mean('100d100'), 5050, places=6)
+
+    def test_limits(self):
+        for expr in ('1000d1000', '20d1000kh10', '51d6kh3', '4d6!kh3'):
+            with self.subTest(expr=expr):
+                with self.assertRaises(DiceError):
+                    dice_distribution(expr)
+
+    def test_stats(self):
+        stats = dice_stats('1d6!')
+        self.assertIn('range     1 to ∞', stats)
+        self.assertIn('mean      4.200', stats)
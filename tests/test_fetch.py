@@ -0,0 +1,87 @@
+#
+# tests/test_fetch.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+import asyncio
+import bisect
+import unittest
+from types import SimpleNamespace
+
+from mawabot.cogs.messages.fetch import CLUSTER_GAP, WINDOW, _clusters, fetch_messages
+
+def snowflake(ms, n=0):
+    return (ms << 22) | n
+
+class FakeChannel:
+    ''' A channel whose history is the given message IDs, counting requests '''
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+        self.requests = []
+
+    async def history(self, limit, around):
+        self.requests.append(around.id)
+
+        # Like Discord, half the window on each side of the given ID
+        index = bisect.bisect_left(self.ids, around.id)
+        start = max(index - limit // 2, 0)
+        for id in reversed(self.ids[start:start + limit]):
+            yield SimpleNamespace(id=id)
+
+class TestClusters(unittest.TestCase):
+    def test_split_on_gaps(self):
+        day = CLUSTER_GAP
+        ids = [snowflake(0), snowflake(10), snowflake(day + 20), snowflake(3 * day)]
+        self.assertEqual(_clusters(ids), [ids[:2], ids[2:3], ids[3:]])
+
+    def test_single(self):
+        self.assertEqual(_clusters([5]), [[5]])
+        self.assertEqual(_clusters([]), [])
+
+class TestFetchMessages(unittest.TestCase):
+    def fetch(self, channel, ids):
+        return asyncio.run(fetch_messages(channel, ids))
+
+    def test_one_window(self):
+        history = [snowflake(1000 * i) for i in range(50)]
+        channel = FakeChannel(history)
+        found = self.fetch(channel, history[::7])
+
+        self.assertEqual(set(found), set(history[::7]))
+        self.assertEqual(len(channel.requests), 1)
+
+    def test_one_window_per_cluster(self):
+        far = 10 * CLUSTER_GAP
+        history = [snowflake(i) for i in range(20)] + [snowflake(far + i) for i in range(20)]
+        channel = FakeChannel(history)
+        found = self.fetch(channel, [history[3], history[10], history[25]])
+
+        self.assertEqual(len(found), 3)
+        self.assertEqual(len(channel.requests), 2)
+
+    def test_wider_than_window(self):
+        # Busy channel, so the wanted IDs are more than one window apart
+        history = [snowflake(i) for i in range(5 * WINDOW)]
+        channel = FakeChannel(history)
+        wanted = [history[0], history[2 * WINDOW], history[-1]]
+        found = self.fetch(channel, wanted)
+
+        self.assertEqual(set(found), set(wanted))
+        self.assertLessEqual(len(channel.requests), 5)
+
+    def test_deleted(self):
+        history = [snowflake(i) for i in range(10)]
+        channel = FakeChannel(history)
+        deleted = snowflake(5, 1)
+        found = self.fetch(channel, [history[2], deleted])
+
+        self.assertEqual(set(found), {history[2]})
+        self.assertEqual(len(channel.requests), 1)
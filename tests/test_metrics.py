@@ -0,0 +1,86 @@
+#
+# tests/test_metrics.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+import logging
+import unittest
+
+from mawabot.metrics import GROWTH, Counters, Histogram, RateLimitCounter, RollingWindow
+
+class TestHistogram(unittest.TestCase):
+    def test_empty(self):
+        hist = Histogram()
+        self.assertEqual(hist.percentile(50), 0.0)
+        self.assertEqual(hist.mean, 0.0)
+
+    def test_percentiles_within_bucket_error(self):
+        hist = Histogram()
+        for ms in range(1, 1001):
+            hist.record(float(ms))
+
+        for pct in (50, 95, 99):
+            exact = pct * 10
+            self.assertGreaterEqual(hist.percentile(pct), exact)
+            self.assertLessEqual(hist.percentile(pct), exact * GROWTH)
+
+        self.assertEqual(hist.count, 1000)
+        self.assertEqual(hist.max, 1000.0)
+        self.assertAlmostEqual(hist.mean, 500.5)
+
+    def test_never_above_max(self):
+        hist = Histogram()
+        hist.record(3.0)
+        self.assertEqual(hist.percentile(100), 3.0)
+
+    def test_extremes(self):
+        hist = Histogram()
+        hist.record(0.0)
+        hist.record(10 ** 9)
+        self.assertEqual(hist.percentile(50), 0.01)
+        self.assertEqual(hist.percentile(100), 10 ** 9)
+
+    def test_to_dict(self):
+        hist = Histogram()
+        hist.record(5.0)
+        data = hist.to_dict()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(sum(data['buckets'].values()), 1)
+        self.assertEqual(data['p50'], 5.0)
+
+class TestRollingWindow(unittest.TestCase):
+    def test_keeps_last(self):
+        window = RollingWindow(size=3)
+        for ms in (100, 1, 2, 3):
+            window.add(ms)
+
+        self.assertEqual(len(window), 3)
+        self.assertEqual(window.last, 3)
+        self.assertEqual(window.percentile(50), 2)
+        self.assertEqual(window.percentile(100), 3)
+
+    def test_empty(self):
+        self.assertEqual(RollingWindow().percentile(95), 0.0)
+
+class TestRateLimitCounter(unittest.TestCase):
+    def test_counts_only_ratelimits(self):
+        counters = Counters()
+        logger = logging.getLogger('tests.discord.http')
+        logger.propagate = False
+        counter = RateLimitCounter(counters)
+        logger.addFilter(counter)
+        try:
+            logger.warning('We are being rate limited. Retrying in %.2f seconds. Handled under the bucket "%s"',
+                           1.5, 'bucket')
+            logger.warning('Global rate limit has been hit. Retrying in %.2f seconds.', 1.5)
+        finally:
+            logger.removeFilter(counter)
+
+        self.assertEqual(counters.ratelimited, 1)
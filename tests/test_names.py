@@ -0,0 +1,56 @@
+#
+# tests/test_names.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+import unittest
+
+from mawabot.names import TrigramIndex, trigrams
+
+class TestTrigrams(unittest.TestCase):
+    def test_padding(self):
+        # Two spaces in front, so keys with the same start share their first grams
+        self.assertEqual(trigrams('ab'), {'  a', ' ab', 'ab '})
+        self.assertLessEqual({'  g', ' ge'}, trigrams('general') & trigrams('gen'))
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramIndex(['general', 'generic', 'gaming', 'memes', 'off-topic'])
+
+    def test_exact_first(self):
+        self.assertEqual(self.index.search('general')[0], 'general')
+
+    def test_prefix_above_fuzzy(self):
+        results = self.index.search('gen')
+        self.assertEqual(set(results[:2]), {'general', 'generic'})
+        self.assertNotIn('memes', results)
+
+    def test_typo(self):
+        self.assertEqual(self.index.search('genral')[0], 'general')
+
+    def test_cutoff(self):
+        self.assertEqual(self.index.search('xyz'), [])
+        self.assertIn('gaming', self.index.search('gamer', cutoff=0.1))
+
+    def test_remove(self):
+        self.index.remove('general')
+        self.assertNotIn('general', self.index.search('general'))
+
+        # Grams only general had are gone, the shared ones stay for generic
+        self.assertNotIn('ral', self.index.postings)
+        self.assertIn('generic', self.index.postings[' ge'])
+
+        # Removing twice, or something never added, does nothing
+        self.index.remove('general')
+        self.index.remove('nothing')
+
+    def test_add_twice(self):
+        self.index.add('memes')
+        self.assertEqual(self.index.search('memes'), ['memes'])
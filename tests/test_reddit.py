@@ -0,0 +1,168 @@
+#
+# tests/test_reddit.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+import asyncio
+import time
+import unittest
+
+from mawabot.cogs.text.reddit_limits import DEFAULT_BACKOFF, RESERVE, RedditLimits
+from mawabot.cogs.text.reddit_pool import LOW_WATERMARK, MAX_POSTS, ListingPool
+
+def headers(remaining, used=0, reset=600):
+    return {
+        'X-Ratelimit-Remaining': str(remaining),
+        'X-Ratelimit-Used': str(used),
+        'X-Ratelimit-Reset': str(reset),
+    }
+
+def post(id, nsfw=False, preview=True, stickied=False):
+    data = {'id': str(id), 'over_18': nsfw, 'stickied': stickied}
+    if preview:
+        data['preview'] = {'images': [{'resolutions': [{}, {}]}]}
+    return {'data': data}
+
+class TestRedditLimits(unittest.TestCase):
+    def setUp(self):
+        self.limits = RedditLimits()
+
+    def test_unknown_budget(self):
+        self.assertEqual(self.limits.delay(True), 0.0)
+        self.assertEqual(self.limits.delay(False), 0.0)
+        self.assertIsNone(self.limits.limit)
+
+    def test_commands_only_wait_when_empty(self):
+        self.limits.update(headers(1, used=599))
+        self.assertEqual(self.limits.delay(True), 0.0)
+
+        self.limits.update(headers(0, used=600, reset=30))
+        self.assertAlmostEqual(self.limits.delay(True), 30, delta=1)
+
+    def test_prefetch_is_spread_out(self):
+        self.limits.update(headers(RESERVE + 99, reset=100))
+        self.assertAlmostEqual(self.limits.delay(False), 1.0, delta=0.1)
+
+    def test_prefetch_leaves_reserve(self):
+        self.limits.update(headers(RESERVE, reset=100))
+        self.assertEqual(self.limits.delay(True), 0.0)
+        self.assertAlmostEqual(self.limits.delay(False), 100, delta=1)
+
+    def test_window_over(self):
+        self.limits.update(headers(0, reset=0))
+        self.assertEqual(self.limits.delay(True), 0.0)
+
+    def test_block(self):
+        self.assertEqual(self.limits.block({'Retry-After': '7'}), 7.0)
+        self.assertAlmostEqual(self.limits.delay(True), 7, delta=0.5)
+        self.assertEqual(self.limits.ratelimited, 1)
+
+        self.assertEqual(RedditLimits().block({}), DEFAULT_BACKOFF)
+
+    def test_acquire_counts(self):
+        self.limits.update(headers(10, used=5))
+        asyncio.run(self.limits.acquire(True))
+        self.assertEqual(self.limits.remaining, 9)
+        self.assertEqual(self.limits.used, 6)
+        self.assertEqual(self.limits.limit, 15)
+
+class FakeReddit:
+    ''' Serves pages of the given posts, recording each request '''
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.requests = []
+
+    async def request(self, path, interactive=True):
+        self.requests.append((path, interactive))
+        children = self.pages.pop(0) if self.pages else []
+        return {'data': {'children': children, 'after': None}}
+
+class TestListingPool(unittest.TestCase):
+    def run_pool(self, pages, test):
+        reddit = FakeReddit(pages)
+
+        async def run():
+            pool = ListingPool('test', reddit.request, asyncio.get_event_loop())
+            try:
+                return await test(pool)
+            finally:
+                pool.close()
+
+        return reddit, asyncio.run(run())
+
+    def test_skips_unusable(self):
+        page = [post(1), post(2, preview=False), post(3, stickied=True), post(1)]
+
+        async def test(pool):
+            await pool.refill()
+            return len(pool)
+
+        _, count = self.run_pool([page], test)
+        self.assertEqual(count, 1)
+
+    def test_sides_capped_separately(self):
+        nsfw = [post(f'n{i}', nsfw=True) for i in range(MAX_POSTS + 50)]
+        safe = [post(f's{i}') for i in range(10)]
+
+        async def test(pool):
+            await pool.refill()
+            await pool.refill()
+            return len(pool.nsfw), len(pool.safe)
+
+        _, sizes = self.run_pool([nsfw, safe], test)
+        self.assertEqual(sizes, (MAX_POSTS, 10))
+
+    def test_sfw_channels_only_get_sfw(self):
+        page = [post(f'n{i}', nsfw=True) for i in range(5)] + [post('s')]
+
+        async def test(pool):
+            first = await pool.take(False)
+            second = await pool.take(False)
+            return first, second
+
+        reddit, (first, second) = self.run_pool([page], test)
+        self.assertEqual(first['id'], 's')
+        self.assertIsNone(second)
+        self.assertTrue(reddit.requests[0][1])
+
+    def test_no_repeats(self):
+        page = [post(i) for i in range(LOW_WATERMARK + 10)]
+
+        async def test(pool):
+            return [(await pool.take(True))['id'] for _ in range(LOW_WATERMARK + 10)]
+
+        _, ids = self.run_pool([page, page], test)
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_command_skips_prefetch(self):
+        # A paced prefetch is stuck waiting, a command still gets a post right away
+        limits = RedditLimits()
+        limits.update(headers(RESERVE // 2, reset=600))
+        reddit = FakeReddit([[post(1)]])
+
+        async def request(path, interactive=True):
+            await limits.acquire(interactive)
+            return await reddit.request(path, interactive)
+
+        async def run():
+            pool = ListingPool('test', request, asyncio.get_event_loop())
+            pool.start_refill()
+            await asyncio.sleep(0)
+            start = time.monotonic()
+            try:
+                item = await asyncio.wait_for(pool.take(False), 5)
+            finally:
+                pool.close()
+            return item, time.monotonic() - start
+
+        item, elapsed = asyncio.run(run())
+        self.assertEqual(item['id'], '1')
+        self.assertLess(elapsed, 1)
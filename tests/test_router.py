@@ -0,0 +1,95 @@
+#
+# tests/test_router.py
+#
+# mawabot - Maware's selfbot
+# Copyright (c) 2017 Ma-wa-re, Ammon Smith
+#
+# mawabot is available free of charge under the terms of the MIT
+# License. You are free to redistribute and/or modify it under those
+# terms. It is distributed in the hopes that it will be useful, but
+# WITHOUT ANY WARRANTY. See the LICENSE file for more details.
+#
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from mawabot.router import SEEN_SIZE, MessageRouter
+
+class Handlers:
+    ''' Stands in for a cog, recording which of its handlers ran '''
+
+    def __init__(self):
+        self.calls = []
+
+    async def first(self, message):
+        self.calls.append(('first', message.content))
+
+    async def second(self, message):
+        self.calls.append(('second', message.content))
+
+    async def broken(self, message):
+        raise RuntimeError('handler failed')
+
+class TestMessageRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = MessageRouter()
+        self.cog = Handlers()
+
+    def dispatch(self, content):
+        asyncio.run(self.router.dispatch(SimpleNamespace(content=content)))
+
+    def test_exact(self):
+        self.router.add_trigger('/shrug', self.cog.first)
+        self.router.add_trigger('/shrug', self.cog.second)
+        self.dispatch('/shrug')
+        self.dispatch('/shrug please')
+        self.assertEqual(self.cog.calls, [('first', '/shrug'), ('second', '/shrug')])
+
+    def test_first_regex_wins(self):
+        self.router.add_trigger(r'\bhi\b', self.cog.first, regex=True)
+        self.router.add_trigger(r'hi there', self.cog.second, regex=True)
+        self.dispatch('oh hi there')
+        self.dispatch('nothing')
+        self.assertEqual(self.cog.calls, [('first', 'oh hi there')])
+
+    def test_exact_before_regex(self):
+        self.router.add_trigger('ping', self.cog.second, regex=True)
+        self.router.add_trigger('ping', self.cog.first)
+        self.assertEqual(self.router.handlers('ping'), [self.cog.first, self.cog.second])
+
+    def test_rejected_patterns(self):
+        for pattern in (r'(a)b', r'(?i)abc', r'(?P<name>x)'):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    self.router.add_trigger(pattern, self.cog.first, regex=True)
+
+        # A rejected pattern doesn't break the ones already there
+        self.router.add_trigger(r'(?:a|b)c', self.cog.first, regex=True)
+        self.assertEqual(self.router.handlers('bc'), [self.cog.first])
+
+    def test_remove_owner(self):
+        other = Handlers()
+        self.router.add_trigger('x', self.cog.first)
+        self.router.add_trigger('y', self.cog.first, regex=True)
+        self.router.add_trigger('x', other.first)
+
+        self.router.remove_owner(self.cog)
+        self.assertEqual(self.router.handlers('x'), [other.first])
+        self.assertEqual(self.router.handlers('y'), [])
+        self.assertIsNone(self.router.combined)
+
+    def test_failing_handler(self):
+        self.router.add_trigger('go', self.cog.broken)
+        self.router.add_trigger('go', self.cog.first)
+        with self.assertLogs('mawabot.router', 'ERROR'):
+            self.dispatch('go')
+        self.assertEqual(self.cog.calls, [('first', 'go')])
+
+    def test_first_seen(self):
+        self.assertTrue(self.router.first_seen(1))
+        self.assertFalse(self.router.first_seen(1))
+
+        for id in range(2, SEEN_SIZE + 2):
+            self.router.first_seen(id)
+        self.assertTrue(self.router.first_seen(1))